@@ -1,141 +1,344 @@
 """Smart Tent Dashboard - Flask + Socket.IO Server with real-time updates."""
+# eventlet must patch the stdlib before time/threading/subprocess are imported
+import eventlet
+eventlet.monkey_patch()
+from eventlet import semaphore, tpool
+
 import os
 import sys
-import asyncio
+import json
+import hashlib
+import copy
+import functools
+import gzip
+import queue
+import logging
 from datetime import datetime, timedelta
-from threading import Thread, Event
+from threading import Event, Lock
 import time
 
-from flask import Flask, jsonify, send_from_directory, request, Response, stream_with_context
-import subprocess
+from flask import Flask, jsonify, send_from_directory, request, Response
 from flask_socketio import SocketIO
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Directory holding the settings/history JSON files (resolved once)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
 
-from backend.devices import get_wiz_status, get_wiz_light_device, get_wiz_heater_status, get_wiz_heater_device, get_dreo_status, get_tapo_status, get_fan_status, get_fan_device, get_tapo_device, get_temp_status, get_temp_device, get_ec_status, get_ec_device
+# Configure logging before the device modules log at import time
+from backend.log_setup import setup_logging, stop_logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+from backend.devices import get_wiz_status, get_wiz_light_device, get_wiz_heater_status, get_wiz_heater_device, get_dreo_status, get_tapo_status, get_fan_status, get_fan_device, get_tapo_device, get_temp_status, get_temp_device, get_ec_status, get_ec_device, close_session
 from backend.runtime_stats import RuntimeTracker
+from backend.temp_history import TempHistory
 from backend.push_notifications import (
     get_public_key, add_subscription, remove_subscription, send_push_notification
 )
 from backend.setup_notes import get_notes, add_note, delete_note
+from backend.video_stream import MJPEGBroadcaster
+from backend.json_provider import ORJSONProvider
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+app.json = ORJSONProvider(app)
+# Static assets are referenced with ?v= cache-busters, so browsers may keep them
+# for an hour; pages revalidate on every load (conditional requests -> 304)
+HTML_MAX_AGE = 0
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
+
+
+def _static_max_age(filename):
+    """Short cache lifetime for pages and the service worker, long for assets."""
+    if filename and filename.endswith(('.html', 'sw.js')):
+        return HTML_MAX_AGE
+    return app.config['SEND_FILE_MAX_AGE_DEFAULT']
+
+
+app.get_send_file_max_age = _static_max_age
+# msgpack frames are smaller and cheaper to encode than JSON (client loads the msgpack bundle);
+# eventlet negotiates permessage-deflate for websocket clients itself, and the
+# threshold lets long-polling gzip the status payload too
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', serializer='msgpack',
+                    http_compression=True, compression_threshold=512)
 
-# Update interval in seconds
 # Update interval in seconds
 UPDATE_INTERVAL = int(os.getenv('POLLING_INTERVAL', 5))
+# Slower interval while no dashboard is connected (automation still runs)
+IDLE_POLL_INTERVAL = int(os.getenv('IDLE_POLLING_INTERVAL', 15))
 
 # Runtime Tracker
 runtime_tracker = RuntimeTracker()
-last_save_time = time.time()
+temp_history = TempHistory()
+RUNTIME_SAVE_INTERVAL = 60  # seconds
+next_save_time = time.monotonic() + RUNTIME_SAVE_INTERVAL
+_save_inflight = None  # green thread running the last periodic save
 
 # Background thread control
 stop_event = Event()
 
+# Number of connected Socket.IO clients
+client_count = 0
+_client_lock = Lock()
+
+# Green threads used to fan device polls out to tpool
+_device_poll_pool = eventlet.GreenPool()
+# A device slower than this is reported unavailable for the tick
+DEVICE_POLL_TIMEOUT = 8  # seconds
+# Devices nothing automates on get their own slower cadence; between polls
+# the last good status is reused, which spares the cloud API (Tapo also
+# backfills its history on every call). Dreo stays on the normal tick: its
+# humidity drives the fan override and the runtime tracker.
+DEVICE_POLL_INTERVALS = {
+    get_tapo_status: int(os.getenv('TAPO_POLLING_INTERVAL', 30)),
+}
+_last_device_polls = {}  # poller -> (monotonic ts, status)
+
+# Last status built by the background loop (monotonic ts, payload and its JSON bytes)
+_latest_status_cache = {'ts': 0, 'payload': None, 'json': None}
+# On-demand poll shared by callers that miss the cache at the same time
+_shared_poll = None
+
+# Per-device JSON as last broadcast, and when the last full status_update went out
+_last_emit = {'devices': None, 'ts': 0}
+FULL_EMIT_INTERVAL = 30  # seconds between full resyncs; ticks in between send deltas
+
 # Push notification state tracking
 last_wiz_state = None
 last_power_above_threshold = False
-last_water_notification_time = 0
-last_ec_water_notification_time = 0
-last_ec_measure_time = 0
-last_humidity_low_notification_time = 0
+last_ec_measure_time = None  # monotonic; None until the first measurement
+# Minimum seconds between two notifications with the same tag
+NOTIF_COOLDOWNS = {
+    'wiz-state': 0,
+    'power-alert': 60,
+    'water-alert': 4 * 60 * 60,
+    'humidity-low': 15 * 60,
+    'water-runout': 4 * 60 * 60,
+}
+_notif_last_sent = {}  # tag -> monotonic time of the last send
+_last_notif_key = None  # snapshot of the notification-relevant state from the last tick
+_push_pool = eventlet.GreenPool(8)  # background push-notification senders
+# Fan/heater/light commands from the automation checks, applied in order by one worker
+_action_queue = queue.Queue(maxsize=64)
+_action_worker = None
+# Held (on the hub) while a device command runs, so manual toggles and the
+# queued automation commands never drive a device at the same time
+_device_command_lock = semaphore.Semaphore()
 POWER_THRESHOLD = 200  # Watts
+KWH_PRICE = float(os.getenv('KWH_PRICE', '0.25'))
+CURRENCY_SYMBOL = os.getenv('CURRENCY_SYMBOL', '\u20ac')
 RTSP_URL = "rtsp://192.168.1.246:554/Streaming/Channels/101"
 
+# One ffmpeg transcode shared by all /video_feed viewers
+mjpeg_broadcaster = MJPEGBroadcaster(RTSP_URL)
+
 # Humidity override state
 humidity_override_active = False
+FAN_HUMIDITY_ON = int(os.getenv('FAN_HUMIDITY_ON', 10))   # % above target to force fan 100%
+FAN_HUMIDITY_OFF = int(os.getenv('FAN_HUMIDITY_OFF', 5))  # % above target to release override
+FAN_AUTH_HASH = hashlib.sha256(os.getenv('FAN_AUTH_CODE', '4444').encode()).hexdigest()
 
 # Heater control state (no interval — checks every polling cycle)
 TEMP_LOG_INTERVAL = 5 * 60      # 5 minutes
-last_temp_log_time = 0
+next_temp_log_time = 0  # monotonic deadline; 0 logs on the first tick
+
+# Light schedule: (settings object, parsed window) and the last (minute, is_on, window) acted on
+_light_window = (None, None)
+_last_light_check = None
 
 # Settings file paths
-HEATER_SETTINGS_FILE = os.path.join(os.path.dirname(__file__), 'heater_settings.json')
-LIGHT_SCHEDULE_FILE = os.path.join(os.path.dirname(__file__), 'light_schedule.json')
-EC_HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'ec_history.json')
-EC_SETTINGS_FILE = os.path.join(os.path.dirname(__file__), 'ec_settings.json')
+HEATER_SETTINGS_FILE = os.path.join(BASE_DIR, 'heater_settings.json')
+LIGHT_SCHEDULE_FILE = os.path.join(BASE_DIR, 'light_schedule.json')
+EC_HISTORY_FILE = os.path.join(BASE_DIR, 'ec_history.json')
+EC_SETTINGS_FILE = os.path.join(BASE_DIR, 'ec_settings.json')
 
+# Parsed settings files: path -> ((mtime_ns, size), data)
+_settings_cache = {}
+
+
+def read_settings_file(path, readonly=False):
+    """Return the parsed JSON in path (None if missing), re-reading only when it changes.
+
+    readonly=True returns the cached object itself; the caller must not modify it.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _settings_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, 'r') as f:
+            cached = (stamp, json.load(f))
+        _settings_cache[path] = cached
+    if readonly:
+        return cached[1]
+    # Callers update the dicts they get back, so hand out a copy
+    return copy.deepcopy(cached[1])
+
+
+def write_json_atomic(path, data, indent=None):
+    """Write JSON via a temp file + rename, so a crash mid-write can't truncate path."""
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_file, path)
+    _settings_cache.pop(path, None)
 
 
 def gen_frames_ffmpeg():
-    """Stream directly from ffmpeg using mpjpeg format which includes boundaries."""
-    cmd = [
-        'ffmpeg',
-        '-rtsp_transport', 'tcp',
-        '-i', RTSP_URL,
-        '-c:v', 'mjpeg',      # Transcode to MJPEG
-        '-q:v', '10',         # Quality
-        '-r', '15',           # Limit framerate
-        '-f', 'mpjpeg',       # Multipart JPEG format
-        '-boundary_tag', 'ffmpeg', # Custom boundary string
-        '-'
-    ]
-    
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-    
+    """Stream the shared ffmpeg mpjpeg output (includes boundaries)."""
+    frames = mjpeg_broadcaster.subscribe()
     try:
-        # Stream stdout directly to the client
-        while True:
-            # Read small chunks
-            data = process.stdout.read(1024)
-            if not data:
-                break
-            yield data
-    except GeneratorExit:
-        process.terminate()
-        process.wait()
+        for frame in frames:
+            yield frame
+            # A viewer catching up on buffered frames never blocks on the
+            # socket, so hand the hub to the status loop between frames
+            eventlet.sleep(0)
+    finally:
+        frames.close()  # unsubscribe as soon as the viewer goes away
+
+
+# (settings object the map was built from, address -> name)
+_sensor_names = (None, {})
+
+
+def get_sensor_names():
+    """Map sensor address -> saved name, rebuilt only when temp_settings.json changes."""
+    global _sensor_names
+    try:
+        saved = read_settings_file(TEMP_SETTINGS_FILE, readonly=True)
     except Exception as e:
-        print(f"Stream error: {e}")
-        process.terminate()
+        logger.error(f'[TEMP] Failed to load settings: {e}')
+        return _sensor_names[1]
+    if saved is not _sensor_names[0]:
+        _sensor_names = (saved, {s['address']: s['name'] for s in (saved or {}).get('sensors', [])})
+    return _sensor_names[1]
 
 
+def add_sensor_names(status):
+    """Merge saved names into a temp status.
 
-def get_temp_status_with_names():
-    """Get temp status and merge with saved names."""
-    status = get_temp_status()
+    Call this on the hub after the poll, not inside the tpool getter: the
+    settings cache and _sensor_names are plain module state.
+    """
     if status.get('available'):
-        settings = load_temp_settings()
-        # Map address -> name
-        name_map = {s['address']: s['name'] for s in settings.get('sensors', [])}
-        
+        name_map = get_sensor_names()
         for sensor in status.get('sensors', []):
             addr = sensor.get('address')
             if addr and addr in name_map:
                 sensor['name'] = name_map[addr]
     return status
 
+
+def get_temp_status_with_names():
+    """Get temp status and merge with saved names."""
+    return add_sensor_names(_poll_device(get_temp_status))
+
 def get_all_device_status():
-    """Fetch status from all devices."""
-    dreo_status = get_dreo_status()
-    
-    # Inject runtime stats
+    """Fetch status from all devices concurrently.
+
+    Each getter blocks on network I/O (and Wiz/Tapo spin up their own
+    asyncio loops), so they run in eventlet's real OS thread pool rather
+    than as green threads sharing one loop. Poll time is the slowest
+    device instead of the sum of all of them.
+    """
+    pollers = (
+        get_wiz_status, get_wiz_heater_status, get_dreo_status, get_tapo_status,
+        get_fan_status, get_temp_status, get_ec_status
+    )
+    wiz, heater, dreo_status, tapo, fan, temp, ec = _device_poll_pool.imap(_poll_device, pollers)
+    temp = add_sensor_names(temp)
+
+    # Inject runtime stats into a copy: the poller may hand back a cached dict
+    dreo_status = dict(dreo_status)
     dreo_status['runtime_stats'] = runtime_tracker.get_metrics()
-    
+
     return {
         'timestamp': datetime.now().isoformat(),
         'devices': {
-            'wiz': get_wiz_status(),
-            'heater': get_wiz_heater_status(),
+            'wiz': wiz,
+            'heater': heater,
             'dreo': dreo_status,
-            'tapo': get_tapo_status(),
-            'fan': get_fan_status(),
-            'temp': get_temp_status_with_names(),
-            'ec': get_ec_status()
+            'tapo': tapo,
+            'fan': fan,
+            'temp': temp,
+            'ec': ec
         }
     }
 
 
+def _poll_device(poller):
+    """Run one status getter in the thread pool; a hang or crash becomes a stub."""
+    interval = DEVICE_POLL_INTERVALS.get(poller)
+    if interval:
+        last = _last_device_polls.get(poller)
+        if last is not None and time.monotonic() - last[0] < interval:
+            return last[1]
+    try:
+        with eventlet.Timeout(DEVICE_POLL_TIMEOUT):
+            status = tpool.execute(poller)
+        if interval and status.get('available') and not status.get('stale'):
+            _last_device_polls[poller] = (time.monotonic(), status)
+        return status
+    except eventlet.Timeout:
+        error = f"timed out after {DEVICE_POLL_TIMEOUT}s"
+    except Exception as e:
+        error = str(e)
+    logger.warning(f"{poller.__name__} failed: {error}")
+    return {'available': False, 'error': error}
+
+
+def poll_devices_shared():
+    """Poll all devices, joining a poll another caller already started.
+
+    A burst of reconnecting clients while the loop idles then costs one
+    round of device calls instead of one per client.
+    """
+    global _shared_poll
+    if _shared_poll is None or _shared_poll.dead:
+        _shared_poll = eventlet.spawn(_poll_and_cache)
+    return _shared_poll.wait()
+
+
+def _poll_and_cache():
+    """Poll all devices and store the result as the latest snapshot.
+
+    Callers arriving before it goes stale (socket handlers, /api/status)
+    then reuse it instead of starting another poll.
+    """
+    status = get_all_device_status()
+    _latest_status_cache['ts'] = time.monotonic()
+    _latest_status_cache['payload'] = status
+    _latest_status_cache['json'] = None
+    return status
+
+
+def save_runtime_async():
+    """Save runtime history on a real OS thread so disk I/O can't stall emits.
+
+    Skips the save if the previous one is still running (e.g. slow SD card).
+    The snapshot is taken here, on the loop that updates the tracker, so the
+    worker thread never iterates the deque while it is being appended to.
+    Periodic saves skip fsync; the final save on shutdown does it.
+    """
+    global _save_inflight
+    if _save_inflight is not None and not _save_inflight.dead:
+        return
+    _save_inflight = eventlet.spawn(tpool.execute, runtime_tracker.write, runtime_tracker.snapshot())
+
+
 def background_update_thread():
     """Background thread that pushes updates to all clients."""
-    global last_save_time, last_wiz_state, last_power_above_threshold, last_water_notification_time, last_ec_water_notification_time, last_ec_measure_time
-    print(f"[INFO] Background update thread started (every {UPDATE_INTERVAL}s)")
+    global next_save_time, last_ec_measure_time
+    logger.info(f"Background update thread started (every {UPDATE_INTERVAL}s)")
     
+    deadline = time.monotonic()
     while not stop_event.is_set():
         try:
             status = get_all_device_status()
@@ -160,24 +363,20 @@ def background_update_thread():
             # Check light schedule automation
             check_light_schedule(status)
             
-            # Track temperature readings
+            # Track temperature readings (saved names were merged in by the poll)
             temp_data = status['devices'].get('temp')
             if temp_data and temp_data.get('available'):
-                settings = load_temp_settings()
-                sensor_map = {s['address']: s['name'] for s in settings.get('sensors', [])}
-                
                 for sensor in temp_data.get('sensors', []):
                     if sensor.get('valid'):
                         address = sensor['address']
-                        name = sensor_map.get(address, sensor.get('name', address))
-                        add_temp_reading(address, sensor['temp_c'], name)
+                        temp_history.add(address, sensor['temp_c'], sensor.get('name', address))
             
             # Check if it's time to trigger an EC physical measurement
-            now = time.time()
+            now = time.monotonic()
             ec_settings = load_ec_settings()
             ec_interval_mins = int(ec_settings.get('interval', 15))
             
-            if now - last_ec_measure_time > ec_interval_mins * 60:
+            if last_ec_measure_time is None or now - last_ec_measure_time > ec_interval_mins * 60:
                 ec_dev = get_ec_device()
                 ec_result = ec_dev.trigger_measurement()
                 if ec_result.get('success'):
@@ -188,101 +387,207 @@ def background_update_thread():
                 last_ec_measure_time = now
 
             # Save periodically (e.g., every 60s)
-            if time.time() - last_save_time > 60:
-                runtime_tracker.save()
-                last_save_time = time.time()
-            
-            socketio.emit('status_update', status)
+            if now >= next_save_time:
+                save_runtime_async()
+                next_save_time = now + RUNTIME_SAVE_INTERVAL
+
+            _latest_status_cache['ts'] = time.monotonic()
+            _latest_status_cache['payload'] = status
+            _latest_status_cache['json'] = None
+            if client_count:
+                # Serialize each device once: reused for the REST body and change detection.
+                # With nobody watching, /api/status serializes on demand instead
+                device_json = serialize_devices(status)
+                _latest_status_cache['json'] = status_body(status, device_json)
+                emit_status(status, device_json)
         except Exception as e:
-            print(f"[ERROR] Background update failed: {e}")
+            logger.error(f"Background update failed: {e}")
         
-        # Wait for next update or stop signal
-        stop_event.wait(UPDATE_INTERVAL)
+        # Wait until the next fixed tick so slow polls don't stretch the interval
+        deadline += UPDATE_INTERVAL if client_count else IDLE_POLL_INTERVAL
+        delay = deadline - time.monotonic()
+        if delay < 0:
+            logger.warning(f"Update cycle overran by {-delay:.1f}s")
+            deadline = time.monotonic()
+            delay = 0
+        if stop_event.wait(delay):
+            break
     
-    # Save on exit
+    # Save on exit (after any periodic save still in flight)
+    if _save_inflight is not None:
+        _save_inflight.wait()
     runtime_tracker.save()
-    print("[INFO] Background update thread stopped")
+    logger.info("Background update thread stopped")
+
+
+def serialize_devices(status):
+    """JSON for each device, keyed by name in sorted order."""
+    return {
+        name: app.json.dumps(device, sort_keys=True, default=str)
+        for name, device in sorted(status['devices'].items())
+    }
+
+
+def status_body(status, device_json):
+    """Assemble the /api/status body from already-serialized devices."""
+    devices_json = ','.join(f'"{name}":{body}' for name, body in device_json.items())
+    return (
+        f'{{"timestamp":{app.json.dumps(status["timestamp"])},"devices":{{{devices_json}}}}}'
+    ).encode('utf-8')
+
+
+def emit_status(status, device_json):
+    """Broadcast only the devices that changed since the last emit.
+
+    Sends a heartbeat when nothing changed, and a full status_update every
+    FULL_EMIT_INTERVAL so a client that missed a delta resyncs.
+    """
+    now = time.monotonic()
+    last = _last_emit['devices']
+    _last_emit['devices'] = device_json
+    if last is None or now - _last_emit['ts'] >= FULL_EMIT_INTERVAL:
+        _last_emit['ts'] = now
+        socketio.emit('status_update', status)
+        return
+    changed = {name: status['devices'][name] for name, body in device_json.items() if last.get(name) != body}
+    if changed:
+        socketio.emit('status_delta', {'timestamp': status['timestamp'], 'devices': changed})
+    else:
+        socketio.emit('heartbeat', {'ts': status['timestamp']})
+
+
+def _send_push_safe(title, body, tag):
+    """Worker for queue_push_notification - log failures instead of raising."""
+    try:
+        send_push_notification(title, body, tag)
+    except Exception as e:
+        logger.error(f"[PUSH] Background send failed: {e}")
+
+
+def queue_push_notification(title, body, tag=None):
+    """Send a push notification off the poll loop so a slow push service can't delay it."""
+    if _push_pool.free() == 0:
+        # Every worker is stuck on the push service - drop rather than pile up
+        logger.warning(f"[PUSH] Dropped '{title}': push service is backed up")
+        return
+    _push_pool.spawn_n(_send_push_safe, title, body, tag)
+
+
+def should_notify(tag):
+    """Return True (and record the send) if tag is outside its cooldown window."""
+    now = time.monotonic()
+    last = _notif_last_sent.get(tag)
+    if last is not None and now - last < NOTIF_COOLDOWNS.get(tag, 0):
+        return False
+    _notif_last_sent[tag] = now
+    return True
+
+
+def run_device_command(fn, *args):
+    """Run one device command in a real thread, one at a time.
+
+    Device libraries may run their own asyncio loop, which can't share the
+    hub's thread with another loop.
+    """
+    with _device_command_lock:
+        return tpool.execute(fn, *args)
+
+
+def _run_device_actions():
+    """Apply queued device commands one at a time, off the poll loop."""
+    while True:
+        label, fn, args = _action_queue.get()
+        try:
+            result = run_device_command(fn, *args)
+            if label:
+                logger.info(f"{label}: {result}")
+        except Exception as e:
+            logger.error(f"Device action failed: {e}")
+
+
+def queue_device_action(label, fn, *args):
+    """Queue a device command; label (if set) is logged with the result."""
+    global _action_worker
+    if _action_worker is None:
+        _action_worker = eventlet.spawn(_run_device_actions)
+    try:
+        _action_queue.put_nowait((label, fn, args))
+    except queue.Full:
+        # Newer commands supersede old ones - drop the oldest
+        try:
+            _action_queue.get_nowait()
+        except queue.Empty:
+            pass
+        _action_queue.put_nowait((label, fn, args))
 
 
 def check_push_notifications(status):
     """Check device states and send push notifications for important events."""
-    global last_wiz_state, last_power_above_threshold, last_water_notification_time, last_humidity_low_notification_time
+    global last_wiz_state, last_power_above_threshold, _last_notif_key
     
     devices = status.get('devices', {})
     wiz = devices.get('wiz', {})
     dreo = devices.get('dreo', {})
     tapo = devices.get('tapo', {})
+    ec_data = devices.get('ec', {})
+    
+    # Skip the per-channel checks when nothing notification-relevant changed,
+    # unless an alert with a repeat cooldown is still active
+    humidity = dreo.get('current_humidity')
+    target = dreo.get('target_humidity')
+    water_empty = bool(dreo.get('available') and dreo.get('water_tank_empty'))
+    humidity_low = bool(dreo.get('available') and humidity is not None and target is not None and humidity < target - 5)
+    ec_empty = bool(ec_data.get('available') and any(
+        ch.get('enabled') and ch.get('water_empty') for ch in ec_data.get('channels', [])
+    ))
+    key = (
+        wiz.get('is_on') if wiz.get('available') else None,
+        tapo.get('current_power_w', 0) > POWER_THRESHOLD if tapo.get('available') else None,
+        water_empty, humidity_low, ec_empty
+    )
+    if key == _last_notif_key and not (water_empty or humidity_low or ec_empty):
+        return
+    _last_notif_key = key
     
     # Wiz socket on/off notification
     if wiz.get('available'):
         current_state = wiz.get('is_on')
         
         if last_wiz_state is not None and current_state != last_wiz_state:
-            try:
-                state_text = "ON 💡" if current_state else "OFF 🌙"
-                send_push_notification("Grow Lights", f"Socket turned {state_text}", "wiz-state")
-            except Exception as e:
-                pass  # Push failed, continue silently
+            state_text = "ON 💡" if current_state else "OFF 🌙"
+            if should_notify('wiz-state'):
+                queue_push_notification("Grow Lights", f"Socket turned {state_text}", "wiz-state")
         last_wiz_state = current_state
     
     # High power notification
     if tapo.get('available'):
         power = tapo.get('current_power_w', 0)
         is_above = power > POWER_THRESHOLD
-        if is_above and not last_power_above_threshold:
-            try:
-                send_push_notification("⚡ High Power", f"Power: {power:.0f}W (>{POWER_THRESHOLD}W)", "power-alert")
-            except Exception as e:
-                pass  # Push failed, continue silently
+        if is_above and not last_power_above_threshold and should_notify('power-alert'):
+            queue_push_notification("⚡ High Power", f"Power: {power:.0f}W (>{POWER_THRESHOLD}W)", "power-alert")
         last_power_above_threshold = is_above
     
     # Water tank empty notification (4 hour cooldown)
-    if dreo.get('available') and dreo.get('water_tank_empty'):
-        now = time.time()
-        if now - last_water_notification_time > 4 * 60 * 60:  # 4 hours
-            try:
-                send_push_notification("💧 Water Empty", "Humidifier water tank is empty!", "water-alert")
-            except Exception as e:
-                pass  # Push failed, continue silently
-            last_water_notification_time = now
+    if water_empty and should_notify('water-alert'):
+        queue_push_notification("💧 Water Empty", "Humidifier water tank is empty!", "water-alert")
     
     # Humidity low notification (15 minute cooldown)
-    if dreo.get('available'):
-        current_humidity = dreo.get('current_humidity')
-        target_humidity = dreo.get('target_humidity')
-        if current_humidity is not None and target_humidity is not None:
-            if current_humidity < target_humidity - 5:
-                now = time.time()
-                if now - last_humidity_low_notification_time > 15 * 60:  # 15 minutes
-                    try:
-                        send_push_notification(
-                            "🌡️ Humidity Low",
-                            f"Humidity {current_humidity}% is {target_humidity - current_humidity}% below target ({target_humidity}%)",
-                            "humidity-low"
-                        )
-                    except Exception as e:
-                        pass  # Push failed, continue silently
-                    last_humidity_low_notification_time = now
-
-    # Water runout alert from ESP32 EC sensor (check all enabled channels)
-    ec_data = devices.get('ec', {})
-    if ec_data.get('available'):
-        for ch in ec_data.get('channels', []):
-            if ch.get('enabled') and ch.get('water_empty'):
-                now = time.time()
-                # Cooldown: 4 hours
-                if now - last_ec_water_notification_time > 4 * 60 * 60:
-                    probe_name = ch.get('name', f"Probe {ch.get('id', '?')}")
-                    try:
-                        send_push_notification(
-                            f"🚱 Water Runout — {probe_name}",
-                            f"{probe_name}: Water level dropped below minimum (ADC < 150).",
-                            "water-runout"
-                        )
-                    except Exception as e:
-                        pass
-                    last_ec_water_notification_time = now
-                break  # Only one notification per cycle
+    if humidity_low and should_notify('humidity-low'):
+        queue_push_notification(
+            "🌡️ Humidity Low",
+            f"Humidity {humidity}% is {target - humidity}% below target ({target}%)",
+            "humidity-low"
+        )
+
+    # Water runout alert from ESP32 EC sensor (first empty channel, 4 hour cooldown)
+    if ec_empty and should_notify('water-runout'):
+        ch = next(ch for ch in ec_data.get('channels', []) if ch.get('enabled') and ch.get('water_empty'))
+        probe_name = ch.get('name', f"Probe {ch.get('id', '?')}")
+        queue_push_notification(
+            f"🚱 Water Runout — {probe_name}",
+            f"{probe_name}: Water level dropped below minimum (ADC < 150).",
+            "water-runout"
+        )
 
 def check_fan_control(status):
     """Check humidity and grow lights to strictly enforce fan speed."""
@@ -308,25 +613,21 @@ def check_fan_control(status):
         current_humidity = dreo.get('current_humidity')
         target_humidity = dreo.get('target_humidity')
         
-        # Get thresholds from env
-        on_threshold = int(os.getenv('FAN_HUMIDITY_ON', 10))
-        off_threshold = int(os.getenv('FAN_HUMIDITY_OFF', 5))
-        
-        trigger_level = target_humidity + on_threshold
-        release_level = target_humidity + off_threshold
+        trigger_level = target_humidity + FAN_HUMIDITY_ON
+        release_level = target_humidity + FAN_HUMIDITY_OFF
         
         if humidity_override_active:
             # Check if we should exit override
             if current_humidity < release_level:
                 humidity_override_active = False
                 should_override = False
-                print(f"[FAN] Humidity override OFF: {current_humidity}% < {release_level}%")
+                logger.info(f"[FAN] Humidity override OFF: {current_humidity}% < {release_level}%")
         else:
             # Check if we should enter override
             if current_humidity >= trigger_level:
                 humidity_override_active = True
                 should_override = True
-                print(f"[FAN] Humidity override ON: {current_humidity}% >= {trigger_level}%")
+                logger.info(f"[FAN] Humidity override ON: {current_humidity}% >= {trigger_level}%")
     
     # Update status for frontend
     status['devices']['fan']['humidity_override'] = humidity_override_active
@@ -353,8 +654,8 @@ def check_fan_control(status):
     # Only set speed if different (and speed is known)
     if current_speed is not None and target_speed is not None:
         if current_speed != target_speed:
-            print(f"[FAN] Enforcing {reason}: {current_speed}% -> {target_speed}%")
-            fan_device.set_speed(target_speed)
+            logger.debug("[FAN] Enforcing %s: %s%% -> %s%%", reason, current_speed, target_speed)
+            queue_device_action(None, fan_device.set_speed, target_speed)
         # Else: Speed is already correct, do nothing
 
 
@@ -364,13 +665,11 @@ def load_heater_settings():
     """Load heater settings from file."""
     defaults = {'enabled': False, 'day_temp': 22, 'night_temp': 20, 'sensor_addresses': [], 'hyst_on': 0.5, 'hyst_off': 2.0}
     try:
-        if os.path.exists(HEATER_SETTINGS_FILE):
-            import json
-            with open(HEATER_SETTINGS_FILE, 'r') as f:
-                saved = json.load(f)
-                return {**defaults, **saved}
+        saved = read_settings_file(HEATER_SETTINGS_FILE)
+        if saved is not None:
+            return {**defaults, **saved}
     except Exception as e:
-        print(f"[HEATER] Failed to load settings: {e}")
+        logger.error(f"[HEATER] Failed to load settings: {e}")
     return defaults
 
 def save_heater_settings(new_settings):
@@ -378,25 +677,21 @@ def save_heater_settings(new_settings):
     try:
         current = load_heater_settings()
         current.update(new_settings)
-        import json
-        with open(HEATER_SETTINGS_FILE, 'w') as f:
-            json.dump(current, f)
+        write_json_atomic(HEATER_SETTINGS_FILE, current)
         return True
     except Exception as e:
-        print(f"[HEATER] Failed to save settings: {e}")
+        logger.error(f"[HEATER] Failed to save settings: {e}")
         return False
 
 def load_light_schedule():
     """Load light schedule settings from file."""
     defaults = {'enabled': False, 'on_time': '06:00', 'off_time': '00:00'}
     try:
-        if os.path.exists(LIGHT_SCHEDULE_FILE):
-            import json
-            with open(LIGHT_SCHEDULE_FILE, 'r') as f:
-                saved = json.load(f)
-                return {**defaults, **saved}
+        saved = read_settings_file(LIGHT_SCHEDULE_FILE)
+        if saved is not None:
+            return {**defaults, **saved}
     except Exception as e:
-        print(f"[LIGHT] Failed to load schedule: {e}")
+        logger.error(f"[LIGHT] Failed to load schedule: {e}")
     return defaults
 
 def save_light_schedule(new_settings):
@@ -404,12 +699,10 @@ def save_light_schedule(new_settings):
     try:
         current = load_light_schedule()
         current.update(new_settings)
-        import json
-        with open(LIGHT_SCHEDULE_FILE, 'w') as f:
-            json.dump(current, f)
+        write_json_atomic(LIGHT_SCHEDULE_FILE, current)
         return True
     except Exception as e:
-        print(f"[LIGHT] Failed to save schedule: {e}")
+        logger.error(f"[LIGHT] Failed to save schedule: {e}")
         return False
 
 
@@ -446,7 +739,6 @@ def check_heater_control(status):
         return
     
     sensors = temp_data.get('sensors', [])
-    avg_temp = 0
     
     # Multi-sensor selection: use selected sensors, or all if none selected
     selected_addresses = heater_settings.get('sensor_addresses', [])
@@ -457,22 +749,19 @@ def check_heater_control(status):
         if old_addr and old_addr != 'average':
             selected_addresses = [old_addr]
     
-    if selected_addresses:
-        # Average of selected sensors
-        selected_temps = [
-            s['temp_c'] for s in sensors
-            if s.get('valid') and s.get('address') in selected_addresses
-        ]
-        if not selected_temps:
-            print(f"[HEATER] No valid readings from selected sensors.")
-            return
-        avg_temp = sum(selected_temps) / len(selected_temps)
-    else:
-        # No sensors selected — use average of all valid sensors
-        valid_temps = [s['temp_c'] for s in sensors if s.get('valid')]
-        if not valid_temps:
-            return
-        avg_temp = sum(valid_temps) / len(valid_temps)
+    # Single pass: average the selected sensors, or every valid one if none are selected
+    selected = set(selected_addresses)
+    total = 0.0
+    count = 0
+    for s in sensors:
+        if s.get('valid') and (not selected or s.get('address') in selected):
+            total += s['temp_c']
+            count += 1
+    if not count:
+        if selected:
+            logger.debug("[HEATER] No valid readings from selected sensors.")
+        return
+    avg_temp = total / count
 
     heater_device = get_wiz_heater_device()
     is_heater_on = heater.get('available') and heater.get('is_on')
@@ -485,31 +774,40 @@ def check_heater_control(status):
 
     if avg_temp < on_threshold:
         if not is_heater_on:
-            result = heater_device.turn_on()
-            print(f"[HEATER] {mode_label} | {avg_temp:.1f}°C < {on_threshold:.1f}°C → ON: {result}")
+            queue_device_action(f"[HEATER] {mode_label} | {avg_temp:.1f}°C < {on_threshold:.1f}°C → ON", heater_device.turn_on)
     elif avg_temp > off_threshold:
         if is_heater_on:
-            result = heater_device.turn_off()
-            print(f"[HEATER] {mode_label} | {avg_temp:.1f}°C > {off_threshold:.1f}°C → OFF: {result}")
+            queue_device_action(f"[HEATER] {mode_label} | {avg_temp:.1f}°C > {off_threshold:.1f}°C → OFF", heater_device.turn_off)
+
+
+def get_light_window():
+    """(on_time, off_time, on_minutes, off_minutes) if the schedule is enabled, else None.
+
+    The HH:MM strings are parsed only when light_schedule.json changes.
+    """
+    global _light_window
+    saved = read_settings_file(LIGHT_SCHEDULE_FILE, readonly=True)
+    if saved is not _light_window[0]:
+        schedule = {'enabled': False, 'on_time': '06:00', 'off_time': '00:00', **(saved or {})}
+        window = None
+        if schedule.get('enabled'):
+            on_hour, on_min = map(int, schedule['on_time'].split(':'))
+            off_hour, off_min = map(int, schedule['off_time'].split(':'))
+            window = (schedule['on_time'], schedule['off_time'], on_hour * 60 + on_min, off_hour * 60 + off_min)
+        _light_window = (saved, window)
+    return _light_window[1]
 
 
 def check_light_schedule(status):
     """Check light schedule and toggle grow lights based on configured times."""
-    schedule = load_light_schedule()
-    
-    if not schedule.get('enabled'):
-        return
-    
-    on_time_str = schedule.get('on_time', '06:00')
-    off_time_str = schedule.get('off_time', '00:00')
-    
+    global _last_light_check
     try:
-        now = datetime.now()
-        on_hour, on_min = map(int, on_time_str.split(':'))
-        off_hour, off_min = map(int, off_time_str.split(':'))
+        window = get_light_window()
+        if window is None:
+            return
+        on_time_str, off_time_str, on_minutes, off_minutes = window
         
-        on_minutes = on_hour * 60 + on_min
-        off_minutes = off_hour * 60 + off_min
+        now = datetime.now()
         now_minutes = now.hour * 60 + now.minute
         
         # Determine if lights should be on
@@ -527,16 +825,21 @@ def check_light_schedule(status):
             return
         
         is_on = wiz.get('is_on', False)
+        # The schedule has minute resolution: re-evaluate only when the minute,
+        # the light state or the schedule changes, so a toggle still in flight
+        # isn't queued again on every tick
+        check = (now_minutes, is_on, window)
+        if check == _last_light_check:
+            return
+        _last_light_check = check
         light_device = get_wiz_light_device()
         
         if should_be_on and not is_on:
-            result = light_device.turn_on()
-            print(f"[LIGHT] Schedule ON ({on_time_str}) → {result}")
+            queue_device_action(f"[LIGHT] Schedule ON ({on_time_str})", light_device.turn_on)
         elif not should_be_on and is_on:
-            result = light_device.turn_off()
-            print(f"[LIGHT] Schedule OFF ({off_time_str}) → {result}")
+            queue_device_action(f"[LIGHT] Schedule OFF ({off_time_str})", light_device.turn_off)
     except Exception as e:
-        print(f"[LIGHT] Schedule check error: {e}")
+        logger.error(f"[LIGHT] Schedule check error: {e}")
 
 
 @app.route('/api/heater/settings', methods=['GET'])
@@ -572,42 +875,77 @@ def set_light_schedule():
 @app.route('/')
 def index():
     """Serve the main dashboard page."""
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_from_directory(app.static_folder, 'index.html', max_age=HTML_MAX_AGE)
 
 
 @app.route('/api/status')
 def api_get_all_status():
     """Get status of all devices (REST fallback)."""
-    return jsonify(get_all_device_status())
+    payload = _latest_status_cache['payload']
+    age = time.monotonic() - _latest_status_cache['ts']
+    if payload is not None and age < UPDATE_INTERVAL:
+        # Serve the bytes the background loop already serialized (or do it once now)
+        if _latest_status_cache['json'] is None:
+            _latest_status_cache['json'] = status_body(payload, serialize_devices(payload))
+        response = Response(_latest_status_cache['json'], mimetype='application/json')
+        response.set_etag(payload['timestamp'])
+        _set_cache_max_age(response, age)
+        return response.make_conditional(request)
+    return jsonify(poll_devices_shared())
+
+
+def _set_cache_max_age(response, age):
+    """Let the browser reuse a cached response until the next poll is due."""
+    response.cache_control.private = True
+    response.cache_control.max_age = max(0, int(UPDATE_INTERVAL - age))
+
+
+def device_status_response(name, poller, finish=None):
+    """Serve one device from the background loop's snapshot, polling only if it's stale.
+
+    finish, if given, post-processes a fresh poll on the hub.
+    """
+    payload = _latest_status_cache['payload']
+    age = time.monotonic() - _latest_status_cache['ts']
+    if payload is not None and age < UPDATE_INTERVAL:
+        response = jsonify(payload['devices'][name])
+        _set_cache_max_age(response, age)
+    else:
+        status = _poll_device(poller)
+        response = jsonify(finish(status) if finish else status)
+    # Content ETag: a device that hasn't changed answers 304 across poll ticks
+    response.add_etag()
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
 
 
 @app.route('/api/wiz')
 def get_wiz():
     """Get Wiz light status."""
-    return jsonify(get_wiz_status())
+    return device_status_response('wiz', get_wiz_status)
 
 
 @app.route('/api/dreo')
 def get_dreo():
     """Get Dreo humidifier status."""
-    return jsonify(get_dreo_status())
+    return device_status_response('dreo', get_dreo_status)
 
 
 @app.route('/api/tapo')
 def get_tapo():
     """Get Tapo energy monitor status."""
-    return jsonify(get_tapo_status())
+    return device_status_response('tapo', get_tapo_status)
 
 
 @app.route('/api/fan')
 def get_fan():
     """Get PWM fan status."""
-    return jsonify(get_fan_status())
+    return device_status_response('fan', get_fan_status)
 
 @app.route('/api/ec')
 def get_ec():
     """Get EC and water runtime status (multi-channel MUX)."""
-    return jsonify(get_ec_status())
+    return device_status_response('ec', get_ec_status)
 
 @app.route('/api/ec/kfactor', methods=['POST'])
 def set_ec_kfactor():
@@ -649,7 +987,7 @@ def api_ec_settings():
     if not code:
         return jsonify({'error': 'Authentication code required'}), 401
     
-    if hashlib.sha256(code.encode()).hexdigest() != hashlib.sha256(os.getenv('FAN_AUTH_CODE', '4444').encode()).hexdigest():
+    if hashlib.sha256(code.encode()).hexdigest() != FAN_AUTH_HASH:
         return jsonify({'error': 'Invalid authentication code'}), 403
     
     if save_ec_settings(data):
@@ -723,11 +1061,9 @@ def api_get_ec_history():
     """Get historic EC data. Optional channel filter."""
     hours = int(request.args.get('hours', 168))
     channel = request.args.get('channel')  # Optional filter
-    history = load_ec_history()
+    history = load_ec_history(readonly=True)
     
-    from datetime import timedelta
-    cutoff = datetime.now() - timedelta(hours=hours)
-    filtered = [r for r in history if datetime.fromisoformat(r['timestamp']) > cutoff]
+    filtered = readings_since(history, datetime.now() - timedelta(hours=hours))
     
     if channel is not None:
         channel = int(channel)
@@ -761,7 +1097,7 @@ def set_fan_speed():
 
 
 # Fan settings storage file
-FAN_SETTINGS_FILE = os.path.join(os.path.dirname(__file__), 'fan_settings.json')
+FAN_SETTINGS_FILE = os.path.join(BASE_DIR, 'fan_settings.json')
 
 def load_fan_settings():
     """Load fan settings from file."""
@@ -774,14 +1110,12 @@ def load_fan_settings():
         'intake_count': 0, 'intake_size': 150, 'intake_max_rpm': 2500, 'intake_min_rpm': 0
     }
     try:
-        if os.path.exists(FAN_SETTINGS_FILE):
-            with open(FAN_SETTINGS_FILE, 'r') as f:
-                import json
-                saved = json.load(f)
-                # Merge saved with defaults to ensure all keys exist
-                return {**default_settings, **saved}
+        saved = read_settings_file(FAN_SETTINGS_FILE)
+        if saved is not None:
+            # Merge saved with defaults to ensure all keys exist
+            return {**default_settings, **saved}
     except Exception as e:
-        print(f"[FAN] Failed to load settings: {e}")
+        logger.error(f"[FAN] Failed to load settings: {e}")
     return default_settings
 
 def save_fan_settings(new_settings):
@@ -791,12 +1125,10 @@ def save_fan_settings(new_settings):
         current = load_fan_settings()
         current.update(new_settings)
         
-        import json
-        with open(FAN_SETTINGS_FILE, 'w') as f:
-            json.dump(current, f)
+        write_json_atomic(FAN_SETTINGS_FILE, current)
         return True
     except Exception as e:
-        print(f"[FAN] Failed to save settings: {e}")
+        logger.error(f"[FAN] Failed to save settings: {e}")
         return False
 
 @app.route('/api/fan/settings')
@@ -816,9 +1148,9 @@ def set_fan_settings():
             if pins:
                 result = fan_device.set_pin(pins)
                 if result.get('success'):
-                    print(f"[FAN] {len(pins)} fan pin(s) synced to ESP32 (restart required)")
+                    logger.info(f"[FAN] {len(pins)} fan pin(s) synced to ESP32 (restart required)")
                 else:
-                    print(f"[FAN] Warning: Could not sync pins to ESP32: {result.get('error')}")
+                    logger.warning(f"[FAN] Could not sync pins to ESP32: {result.get('error')}")
         
         return jsonify(load_fan_settings())
     return jsonify({'error': 'Failed to save'}), 500
@@ -868,55 +1200,65 @@ def verify_fan_auth():
     
     return jsonify({'valid': is_valid}), 200 if is_valid else 403
 
-def load_ec_history():
-    """Load EC history from file."""
+def load_ec_history(readonly=False):
+    """Load EC history from file (reparsed only when the file changes)."""
     try:
-        if os.path.exists(EC_HISTORY_FILE):
-            import json
-            with open(EC_HISTORY_FILE, 'r') as f:
-                return json.load(f)
+        history = read_settings_file(EC_HISTORY_FILE, readonly=readonly)
+        if history is not None:
+            return history
     except Exception as e:
-        print(f'[EC] Failed to load history: {e}')
+        logger.error(f'[EC] Failed to load history: {e}')
     return []
 
+def readings_since(history, cutoff):
+    """Readings newer than the cutoff datetime from a chronological list.
+
+    Binary search on the ISO timestamp strings (naive ISO sorts the same
+    as the datetimes), so nothing is parsed and the result is one slice.
+    """
+    cutoff = cutoff.isoformat()
+    lo, hi = 0, len(history)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if history[mid]['timestamp'] <= cutoff:
+            lo = mid + 1
+        else:
+            hi = mid
+    return history[lo:]
+
 def save_ec_history(history):
     """Save EC history to file."""
     try:
-        import json
-        with open(EC_HISTORY_FILE, 'w') as f:
-            json.dump(history, f)
+        write_json_atomic(EC_HISTORY_FILE, history)
         return True
     except Exception as e:
-        print(f'[EC] Failed to save history: {e}')
+        logger.error(f'[EC] Failed to save history: {e}')
         return False
 
 def load_ec_settings():
     """Load EC settings from file."""
     default_settings = {'interval': 15}
     try:
-        if os.path.exists(EC_SETTINGS_FILE):
-            import json
-            with open(EC_SETTINGS_FILE, 'r') as f:
-                saved = json.load(f)
-                return {**default_settings, **saved}
+        saved = read_settings_file(EC_SETTINGS_FILE)
+        if saved is not None:
+            return {**default_settings, **saved}
     except Exception as e:
-        print(f'[EC] Failed to load settings: {e}')
+        logger.error(f'[EC] Failed to load settings: {e}')
     return default_settings
 
 def save_ec_settings(settings):
     """Save EC settings to file."""
     try:
-        import json
-        with open(EC_SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f)
+        write_json_atomic(EC_SETTINGS_FILE, settings)
         return True
     except Exception as e:
-        print(f'[EC] Failed to save settings: {e}')
+        logger.error(f'[EC] Failed to save settings: {e}')
         return False
 
 def add_ec_reading(ec_value, raw_adc, channel_id=0, channel_name='Probe 0'):
     """Add an EC reading to history (per-channel)."""
-    history = load_ec_history()
+    # Readings are never modified in place, so a shallow copy of the cached list will do
+    history = list(load_ec_history(readonly=True))
     
     # Check per-channel rate limit (15 min between logs for same channel)
     now = datetime.now()
@@ -937,9 +1279,7 @@ def add_ec_reading(ec_value, raw_adc, channel_id=0, channel_name='Probe 0'):
     history.append(reading)
     
     # Keep only last 14 days
-    from datetime import timedelta
-    cutoff = now - timedelta(days=14)
-    history = [r for r in history if datetime.fromisoformat(r['timestamp']) > cutoff]
+    history = readings_since(history, now - timedelta(days=14))
     
     save_ec_history(history)
     return reading
@@ -957,8 +1297,7 @@ def health():
 # ============== TEMPERATURE SENSOR ENDPOINTS ==============
 
 # Temperature settings storage file
-TEMP_SETTINGS_FILE = os.path.join(os.path.dirname(__file__), 'temp_settings.json')
-TEMP_HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'temp_history.json')
+TEMP_SETTINGS_FILE = os.path.join(BASE_DIR, 'temp_settings.json')
 
 def load_temp_settings():
     """Load temperature sensor settings from file."""
@@ -968,68 +1307,22 @@ def load_temp_settings():
         'sensors': []
     }
     try:
-        if os.path.exists(TEMP_SETTINGS_FILE):
-            with open(TEMP_SETTINGS_FILE, 'r') as f:
-                import json
-                return json.load(f)
+        saved = read_settings_file(TEMP_SETTINGS_FILE)
+        if saved is not None:
+            return saved
     except Exception as e:
-        print(f'[TEMP] Failed to load settings: {e}')
+        logger.error(f'[TEMP] Failed to load settings: {e}')
     return default_settings
 
 def save_temp_settings(settings):
     """Save temperature sensor settings to file."""
     try:
-        import json
-        with open(TEMP_SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
+        write_json_atomic(TEMP_SETTINGS_FILE, settings, indent=2)
         return True
     except Exception as e:
-        print(f'[TEMP] Failed to save settings: {e}')
+        logger.error(f'[TEMP] Failed to save settings: {e}')
         return False
 
-def load_temp_history():
-    """Load temperature history from file."""
-    try:
-        if os.path.exists(TEMP_HISTORY_FILE):
-            with open(TEMP_HISTORY_FILE, 'r') as f:
-                import json
-                return json.load(f)
-    except Exception as e:
-        print(f'[TEMP] Failed to load history: {e}')
-    return []
-
-def save_temp_history(history):
-    """Save temperature history to file."""
-    try:
-        import json
-        with open(TEMP_HISTORY_FILE, 'w') as f:
-            json.dump(history, f)
-        return True
-    except Exception as e:
-        print(f'[TEMP] Failed to save history: {e}')
-        return False
-
-def add_temp_reading(sensor_address, temp_c, sensor_name=None):
-    """Add a temperature reading to history."""
-    history = load_temp_history()
-    
-    # Add new reading
-    reading = {
-        'timestamp': datetime.now().isoformat(),
-        'address': sensor_address,
-        'name': sensor_name,
-        'temp_c': temp_c
-    }
-    history.append(reading)
-    
-    # Keep only last 7 days of data
-    from datetime import timedelta
-    cutoff = datetime.now() - timedelta(days=7)
-    history = [r for r in history if datetime.fromisoformat(r['timestamp']) > cutoff]
-    
-    save_temp_history(history)
-    return reading
-
 @app.route('/api/temp/settings')
 def get_temp_settings():
     """Get temperature sensor settings."""
@@ -1046,7 +1339,7 @@ def set_temp_settings():
 @app.route('/api/temp/status')
 def get_temp():
     """Get temperature sensor status."""
-    return jsonify(get_temp_status_with_names())
+    return device_status_response('temp', get_temp_status, add_sensor_names)
 
 @app.route('/api/temp/detect', methods=['POST'])
 def detect_temp_sensors():
@@ -1098,13 +1391,12 @@ def set_temp_sensor_name():
 
 def check_temp_logging(status):
     """Log temperature data periodically."""
-    global last_temp_log_time
-    import time
+    global next_temp_log_time
     
-    now = time.time()
-    if now - last_temp_log_time < TEMP_LOG_INTERVAL:
+    now = time.monotonic()
+    if now < next_temp_log_time:
         return
-    last_temp_log_time = now
+    next_temp_log_time = now + TEMP_LOG_INTERVAL
     
     temp_status = status.get('devices', {}).get('temp', {})
     if not temp_status.get('available'):
@@ -1114,7 +1406,7 @@ def check_temp_logging(status):
     count = 0
     for sensor in sensors:
         if sensor.get('valid'):
-            add_temp_reading(
+            temp_history.add(
                 sensor['address'],
                 sensor['temp_c'],
                 sensor.get('name')
@@ -1122,26 +1414,23 @@ def check_temp_logging(status):
             count += 1
     
     if count > 0:
-        print(f"[TEMP] Logged history for {count} sensors")
+        logger.debug("[TEMP] Logged history for %d sensors", count)
 
 @app.route('/api/temp/history')
 def get_temp_history():
     """Get temperature history."""
     hours = int(request.args.get('hours', 24))
-    history = load_temp_history()
-    
-    # Filter by time range
-    from datetime import timedelta
     cutoff = datetime.now() - timedelta(hours=hours)
-    filtered = [r for r in history if datetime.fromisoformat(r['timestamp']) > cutoff]
-    
-    return jsonify(filtered)
+    return jsonify(temp_history.since(cutoff))
 
 
 @app.route('/stats')
 def stats_page():
     """Serve the stats page."""
-    return send_from_directory(app.static_folder, 'stats.html')
+    return send_from_directory(app.static_folder, 'stats.html', max_age=HTML_MAX_AGE)
+
+
+STATS_CACHE_SECONDS = 30
 
 
 @app.route('/api/stats')
@@ -1149,41 +1438,88 @@ def api_stats():
     """Get aggregated stats for the stats page."""
     period = int(request.args.get('period', 30))
     period = min(period, 365)  # cap at 1 year
-    
+    return cached_json_response(*_stats_json(period, int(time.monotonic() // STATS_CACHE_SECONDS)))
+
+
+# Bodies smaller than this aren't worth gzipping
+GZIP_MIN_SIZE = 1024
+
+
+def cached_json_response(body, etag, gzipped=None):
+    """Serve a pre-serialized JSON body; a client that already has it gets a 304.
+
+    no-cache rather than max-age: the stats page reloads right after a note
+    is added or deleted and must see the change.
+    """
+    if gzipped is not None and request.accept_encodings['gzip']:
+        response = Response(gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gz'  # each encoding needs its own strong ETag
+    else:
+        response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _cacheable_body(body):
+    """Encode a serialized body once, with its ETag and (if large) a gzipped copy.
+
+    Done when the body is cached, so repeat requests cost no serializing,
+    hashing or compressing.
+    """
+    data = body.encode('utf-8')
+    gzipped = gzip.compress(data, compresslevel=6) if len(data) >= GZIP_MIN_SIZE else None
+    return data, hashlib.md5(data).hexdigest(), gzipped
+
+
+@functools.lru_cache(maxsize=8)
+def _stats_json(period, bucket):
+    """Build the stats payload for caching; the time bucket argument expires entries every 30s."""
     # Humidity runtime history
     humidity_data = runtime_tracker.get_daily_history_range(period)
     
     # Energy data — all from accumulated daily store
     tapo = get_tapo_device()
-    kwh_price = float(os.getenv('KWH_PRICE', '0.25'))
-    
-    # Temperature history
-    temp_history = load_temp_history()
-    
+    kwh_price = KWH_PRICE
     
+    # Temperature history, one time/value series per sensor
     cutoff_date = datetime.now() - timedelta(days=period)
-    temp_filtered = [r for r in temp_history if datetime.fromisoformat(r['timestamp']) > cutoff_date]
+    temp_series = temp_history.series_since(cutoff_date)
     
     # Current sensor names for legend
     temp_settings = load_temp_settings()
     
-    return jsonify({
+    return _cacheable_body(app.json.dumps({
         'humidity_runtime': humidity_data,
         'energy_daily': tapo.get_history_range(period),
         'energy_monthly': tapo.get_monthly_breakdown(kwh_price),
-        'temp_history': temp_filtered,
+        'temp_series': temp_series,
         'temp_sensors': temp_settings.get('sensors', []),
         'notes': get_notes(),
         'period': period,
         'kwh_price': kwh_price,
-        'currency': os.getenv('CURRENCY_SYMBOL', '\u20ac')
-    })
+        'currency': CURRENCY_SYMBOL
+    }))
 
 
 @app.route('/api/notes')
 def api_get_notes():
     """Get all setup change notes."""
-    return jsonify(get_notes())
+    return cached_json_response(*_notes_json())
+
+
+@functools.lru_cache(maxsize=1)
+def _notes_json():
+    """Serialized notes list for caching; only changes through the add/delete routes below."""
+    return _cacheable_body(app.json.dumps(get_notes()))
+
+
+def clear_notes_cache():
+    """Drop the cached notes and the stats payloads that embed them."""
+    _notes_json.cache_clear()
+    _stats_json.cache_clear()
 
 
 @app.route('/api/notes', methods=['POST'])
@@ -1195,6 +1531,7 @@ def api_add_note():
     
     date_str = data.get('date', datetime.now().strftime('%Y-%m-%d'))
     note = add_note(date_str, data['text'])
+    clear_notes_cache()
     return jsonify(note)
 
 
@@ -1202,6 +1539,7 @@ def api_add_note():
 def api_delete_note(note_id):
     """Delete a setup change note."""
     if delete_note(note_id):
+        clear_notes_cache()
         return jsonify({'success': True})
     return jsonify({'error': 'Note not found'}), 404
 
@@ -1209,7 +1547,12 @@ def api_delete_note(note_id):
 @app.route('/api/push/key')
 def push_public_key():
     """Get the VAPID public key for push subscription."""
-    return jsonify({'publicKey': get_public_key()})
+    response = jsonify({'publicKey': get_public_key()})
+    # The client compares this to its subscription to spot regenerated keys,
+    # so let it revalidate (304) rather than reuse a cached copy blindly
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route('/api/push/subscribe', methods=['POST'])
@@ -1235,18 +1578,6 @@ def push_unsubscribe():
 
 # =========== HEATER API ===========
 
-@app.route('/api/heater/settings', methods=['GET', 'POST'])
-def heater_settings_api():
-    """Get or save heater settings."""
-    if request.method == 'GET':
-        return jsonify(load_heater_settings())
-    
-    data = request.json
-    if save_heater_settings(data):
-        return jsonify(load_heater_settings())
-    return jsonify({'error': 'Failed to save'}), 500
-
-
 @app.route('/api/heater/toggle', methods=['POST'])
 def heater_toggle():
     """Manually turn heater on/off."""
@@ -1256,33 +1587,17 @@ def heater_toggle():
     heater_device = get_wiz_heater_device()
     
     if action == 'on':
-        result = heater_device.turn_on()
+        result = run_device_command(heater_device.turn_on)
     elif action == 'off':
-        result = heater_device.turn_off()
+        result = run_device_command(heater_device.turn_off)
     else:
-        status = heater_device.get_status()
-        if status.get('is_on'):
-            result = heater_device.turn_off()
-        else:
-            result = heater_device.turn_on()
+        result = run_device_command(heater_device.toggle)
     
     return jsonify(result)
 
 
 # =========== LIGHT SCHEDULE API ===========
 
-@app.route('/api/light/schedule', methods=['GET', 'POST'])
-def light_schedule_api():
-    """Get or save light schedule settings."""
-    if request.method == 'GET':
-        return jsonify(load_light_schedule())
-    
-    data = request.json
-    if save_light_schedule(data):
-        return jsonify(load_light_schedule())
-    return jsonify({'error': 'Failed to save'}), 500
-
-
 @app.route('/api/light/toggle', methods=['POST'])
 def light_toggle():
     """Manually turn grow light on/off."""
@@ -1292,52 +1607,72 @@ def light_toggle():
     light_device = get_wiz_light_device()
     
     if action == 'on':
-        result = light_device.turn_on()
+        result = run_device_command(light_device.turn_on)
     elif action == 'off':
-        result = light_device.turn_off()
+        result = run_device_command(light_device.turn_off)
     else:
-        status = light_device.get_status()
-        if status.get('is_on'):
-            result = light_device.turn_off()
-        else:
-            result = light_device.turn_on()
+        result = run_device_command(light_device.toggle)
     
     return jsonify(result)
 
 
-@socketio.on('connect')
-def handle_connect():
-    """Handle client connection - send initial status."""
-    print("[SOCKET] Client connected")
+def send_fresh_status(sid):
+    """Poll all devices and send the result to a single client."""
     try:
-        status = get_all_device_status()
-        socketio.emit('status_update', status)
+        socketio.emit('status_update', poll_devices_shared(), to=sid)
     except Exception as e:
-        print(f"[ERROR] Failed to send initial status: {e}")
+        logger.error(f"Failed to send fresh status: {e}")
+
+
+def send_latest_status(sid, max_age):
+    """Send the last snapshot right away; refresh it in the background if older than max_age.
+
+    Handlers never wait on a device call, so one slow device can't hold up
+    a client's connect or refresh.
+    """
+    status = _latest_status_cache['payload']
+    if status is not None:
+        socketio.emit('status_update', status, to=sid)
+    if status is None or time.monotonic() - _latest_status_cache['ts'] > max_age:
+        socketio.start_background_task(send_fresh_status, sid)
+
+
+@socketio.on('connect')
+def handle_connect():
+    """Handle client connection - send initial status to that client only."""
+    global client_count
+    with _client_lock:
+        client_count += 1
+    logger.info(f"[SOCKET] Client connected ({client_count} total)")
+    # Refresh only if nothing was polled yet or the loop was idling
+    send_latest_status(request.sid, UPDATE_INTERVAL)
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
-    print("[SOCKET] Client disconnected")
+    global client_count
+    with _client_lock:
+        client_count = max(0, client_count - 1)
+    logger.info(f"[SOCKET] Client disconnected ({client_count} left)")
 
 
 @socketio.on('request_update')
 def handle_request_update():
     """Handle manual update request from client."""
-    try:
-        status = get_all_device_status()
-        socketio.emit('status_update', status)
-    except Exception as e:
-        print(f"[ERROR] Failed to send requested update: {e}")
+    # Sent after a control action, so follow up with a poll unless the snapshot is very recent
+    send_latest_status(request.sid, UPDATE_INTERVAL / 2)
 
 
 @app.route('/video_feed')
 def video_feed():
     """Video streaming route."""
+    # The generator only reads the shared ffmpeg buffer, so there is no need
+    # to keep the request context alive for the lifetime of the stream
     return Response(
-        stream_with_context(gen_frames_ffmpeg()),
-        mimetype='multipart/x-mixed-replace; boundary=ffmpeg'
+        gen_frames_ffmpeg(),
+        mimetype='multipart/x-mixed-replace; boundary=ffmpeg',
+        direct_passthrough=True  # chunks are already bytes, skip Werkzeug's body wrapping
     )
 
 
@@ -1353,13 +1688,17 @@ if __name__ == '__main__':
     print("See docs/HTTPS_SETUP.md for details.")
     print("\n" + "=" * 50)
     
-    # Start background update thread
-    update_thread = Thread(target=background_update_thread, daemon=True)
-    update_thread.start()
-    
+    # Start background update task on the eventlet hub
+    update_thread = socketio.start_background_task(background_update_thread)
+
     try:
         # HTTP mode - use Cloudflare Tunnel for HTTPS
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
+        socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
     finally:
         stop_event.set()
-        update_thread.join(timeout=2)
+        with eventlet.Timeout(2, False):
+            update_thread.join()
+        close_session()
+        temp_history.close()
+        get_tapo_device().flush()
+        stop_logging()
@@ -5,6 +5,7 @@ from .tapo_device import get_tapo_status, get_tapo_device, TapoDevice
 from .fan_device import get_fan_status, get_fan_device, FanDevice
 from .temp_device import get_temp_status, get_temp_device, TempDevice
 from .ec_device import get_ec_status, get_ec_device, ECDevice
+from .http_session import close_session
 
 __all__ = [
     'get_wiz_status', 'get_wiz_light_device', 'get_wiz_heater_status', 'get_wiz_heater_device', 'WizDevice',
@@ -12,6 +13,7 @@ __all__ = [
     'get_tapo_status', 'get_tapo_device', 'TapoDevice',
     'get_fan_status', 'get_fan_device', 'FanDevice',
     'get_temp_status', 'get_temp_device', 'TempDevice',
-    'get_ec_status', 'get_ec_device', 'ECDevice'
+    'get_ec_status', 'get_ec_device', 'ECDevice',
+    'close_session'
 ]
 
@@ -1,8 +1,13 @@
 """Dreo Humidifier integration using pydreo-cloud."""
+import hashlib
+import logging
+import time
 from datetime import datetime
 from typing import Optional
 import os
 
+logger = logging.getLogger(__name__)
+
 # Try to import the pydreo-cloud package
 DREO_AVAILABLE = False
 DreoClientClass = None
@@ -16,7 +21,7 @@ try:
     eu_url = "https://open-api-eu.dreo-tech.com"
     pydreo.helpers.BASE_URL = eu_url
     pydreo.helpers.US_BASE_URL = eu_url  # Just in case it's aliased
-    print(f"[DREO] Patched API URL to: {eu_url}")
+    logger.info(f"[DREO] Patched API URL to: {eu_url}")
     
     DreoClientClass = DreoClient
     DREO_AVAILABLE = True
@@ -27,12 +32,42 @@ except ImportError:
 class DreoDevice:
     """Interface for Dreo smart humidifier."""
     
+    LOGIN_TTL = 3600  # seconds a login is reused before refreshing the token
+    STALE_MAX_AGE = 600  # seconds the last good status may stand in for a failed poll
+    
     def __init__(self, email: Optional[str] = None, password: Optional[str] = None):
         self.email = email or os.getenv('DREO_EMAIL')
         self.password = password or os.getenv('DREO_PASSWORD')
+        # Dreo (EU) requires password to be MD5 hashed
+        self._hashed_pw = hashlib.md5(self.password.encode('utf-8')).hexdigest() if self.password else None
         self.last_state: Optional[bool] = None
         self.on_since: Optional[datetime] = None
         self._client = None
+        self._login_time = 0.0
+        self._last_good = None  # (monotonic time, status) of the last successful poll
+        
+    def _login(self):
+        """Log in to Dreo cloud and keep the client for later polls."""
+        self._client = None
+        client = DreoClientClass(self.email, self._hashed_pw)
+        client.login()
+        self._client = client
+        self._login_time = time.monotonic()
+    
+    def _get_devices(self):
+        """List the account's devices, logging in only when there's no recent session."""
+        reused = self._client is not None and time.monotonic() - self._login_time < self.LOGIN_TTL
+        if not reused:
+            self._login()
+        try:
+            return self._client.get_devices()
+        except Exception:
+            self._client = None
+            if not reused:
+                raise
+            # The token may have been revoked early - log in again once
+            self._login()
+            return self._client.get_devices()
         
     def get_status(self) -> dict:
         """Get current status of the Dreo humidifier."""
@@ -51,17 +86,8 @@ class DreoDevice:
             }
         
         try:
-            # Initialize client and login
-            # Dreo (EU) requires password to be MD5 hashed
-            import hashlib
-            hashed_pw = hashlib.md5(self.password.encode('utf-8')).hexdigest()
-            # print(f"[DREO] Using MD5 hashed password for EU auth")
-            
-            client = DreoClientClass(self.email, hashed_pw)
-            login_response = client.login()
-            
-            # Get devices list
-            devices = client.get_devices()
+            # Get devices list (reuses the logged-in client between polls)
+            devices = self._get_devices()
             
             if not devices:
                 return {
@@ -149,7 +175,7 @@ class DreoDevice:
                             is_working = is_on if is_on else False
                             
                 except Exception as e:
-                    print(f"[DREO] Object parsing error: {e}")
+                    logger.error(f"[DREO] Object parsing error: {e}")
                     is_on = False
                     is_working = False
                     current_humidity = None
@@ -172,7 +198,7 @@ class DreoDevice:
             # print(f"[DREO DEBUG] Device state keys: {state.keys()}")
             # print(f"[DREO DEBUG] Full device dump: {device}")
 
-            return {
+            status = {
                 'available': True,
                 'is_on': is_on,
                 'is_working': is_working,  # True if actively misting
@@ -181,11 +207,16 @@ class DreoDevice:
                 'mode': mode,
                 'uptime_seconds': uptime_seconds
             }
+            self._last_good = (time.monotonic(), status)
+            return status
             
         except Exception as e:
             error_msg = str(e)
             if 'password' in error_msg.lower() or 'auth' in error_msg.lower():
-                print(f"[DREO] Authentication failed: {error_msg}")
+                logger.error(f"[DREO] Authentication failed: {error_msg}")
+            # Ride out a cloud blip on the last known state rather than blanking the tile
+            if self._last_good and time.monotonic() - self._last_good[0] < self.STALE_MAX_AGE:
+                return {**self._last_good[1], 'stale': True, 'error': f'[DREO] {error_msg}'}
             return {
                 'available': False,
                 'device': 'Dreo Humidifier',
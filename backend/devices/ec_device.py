@@ -8,6 +8,8 @@ import os
 from typing import Optional
 import requests
 
+from .http_session import session
+
 
 class ECDevice:
     """Interface for ESP32 MUX EC Controller."""
@@ -33,7 +35,7 @@ class ECDevice:
             }
         
         try:
-            response = requests.get(
+            response = session.get(
                 f"{self._get_base_url()}/status",
                 timeout=self.TIMEOUT
             )
@@ -79,7 +81,7 @@ class ECDevice:
             if channel is not None:
                 url += f"?channel={channel}"
             
-            response = requests.post(url, timeout=self.MEASURE_TIMEOUT)
+            response = session.post(url, timeout=self.MEASURE_TIMEOUT)
             response.raise_for_status()
             data = response.json()
             data['success'] = True
@@ -106,7 +108,7 @@ class ECDevice:
         payload.update(kwargs)
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/channel/config",
                 json=payload,
                 timeout=self.TIMEOUT
@@ -134,7 +136,7 @@ class ECDevice:
             return {'success': False, 'error': 'ESP32_EC_IP not configured'}
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/channel/calibrate",
                 json={'channel': channel, 'reference_ec': reference_ec},
                 timeout=self.MEASURE_TIMEOUT
@@ -156,7 +158,7 @@ class ECDevice:
         auth_hash = hashlib.sha256((code or self._auth_code).encode()).hexdigest()
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/kfactor",
                 json={'kfactor': kfactor, 'auth_hash': auth_hash, 'channel': channel},
                 timeout=self.TIMEOUT
@@ -183,7 +185,7 @@ class ECDevice:
         auth_hash = hashlib.sha256(code.encode()).hexdigest()
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/auth",
                 json={'auth_hash': auth_hash},
                 timeout=self.TIMEOUT
@@ -199,7 +201,7 @@ class ECDevice:
             return {'count': 0, 'sensors': []}
         
         try:
-            response = requests.get(
+            response = session.get(
                 f"{self._get_base_url()}/sensors",
                 timeout=self.TIMEOUT
             )
@@ -4,6 +4,8 @@ import os
 from typing import Optional
 import requests
 
+from .http_session import session
+
 
 class FanDevice:
     """Interface for ESP32 PWM fan controller."""
@@ -13,14 +15,18 @@ class FanDevice:
     def __init__(self, ip_address: Optional[str] = None, auth_code: Optional[str] = None):
         self.ip = ip_address or os.getenv('ESP32_FAN_IP')
         self._auth_code = auth_code or os.getenv('FAN_AUTH_CODE', '4444')
+        self.humidity_on = int(os.getenv('FAN_HUMIDITY_ON', 10))
+        self.humidity_off = int(os.getenv('FAN_HUMIDITY_OFF', 5))
+        self._base_url = f"http://{self.ip}"
+        self._auth_hash = hashlib.sha256(self._auth_code.encode()).hexdigest()
         
-    def _get_auth_hash(self) -> str:
-        """Generate SHA-256 hash of the auth code."""
-        return hashlib.sha256(self._auth_code.encode()).hexdigest()
+    def _get_auth_hash(self, code: Optional[str] = None) -> str:
+        """SHA-256 hash of the provided code, or of the stored one (hashed once in __init__)."""
+        return hashlib.sha256(code.encode()).hexdigest() if code else self._auth_hash
     
     def _get_base_url(self) -> str:
-        """Get base URL for ESP32."""
-        return f"http://{self.ip}"
+        """Get base URL for ESP32 (built once in __init__)."""
+        return self._base_url
     
     def get_status(self) -> dict:
         """Get current fan status from ESP32."""
@@ -32,16 +38,16 @@ class FanDevice:
             }
         
         try:
-            response = requests.get(
+            response = session.get(
                 f"{self._get_base_url()}/status",
                 timeout=self.TIMEOUT
             )
             response.raise_for_status()
             data = response.json()
             data['device'] = 'PWM Fan'
-            # Add humidity override thresholds from env
-            data['humidity_on'] = int(os.getenv('FAN_HUMIDITY_ON', 10))
-            data['humidity_off'] = int(os.getenv('FAN_HUMIDITY_OFF', 5))
+            # Add humidity override thresholds (read from env once)
+            data['humidity_on'] = self.humidity_on
+            data['humidity_off'] = self.humidity_off
             return data
             
         except requests.Timeout:
@@ -72,10 +78,10 @@ class FanDevice:
             return {'success': False, 'error': 'ESP32_FAN_IP not configured'}
         
         # Hash the provided code or use stored code
-        auth_hash = hashlib.sha256((code or self._auth_code).encode()).hexdigest()
+        auth_hash = self._get_auth_hash(code)
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/speed",
                 json={'speed': speed, 'auth_hash': auth_hash},
                 timeout=self.TIMEOUT
@@ -104,10 +110,10 @@ class FanDevice:
             pins = [pins]
         
         # Hash the provided code or use stored code
-        auth_hash = hashlib.sha256((code or self._auth_code).encode()).hexdigest()
+        auth_hash = self._get_auth_hash(code)
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/pin",
                 json={'pins': pins, 'auth_hash': auth_hash},
                 timeout=self.TIMEOUT
@@ -132,7 +138,7 @@ class FanDevice:
             return {'success': False, 'error': 'ESP32_FAN_IP not configured'}
         
         try:
-            response = requests.get(
+            response = session.get(
                 f"{self._get_base_url()}/schedule",
                 timeout=self.TIMEOUT
             )
@@ -148,10 +154,10 @@ class FanDevice:
             return {'success': False, 'error': 'ESP32_FAN_IP not configured'}
         
         # Hash the provided code or use stored code
-        auth_hash = hashlib.sha256((code or self._auth_code).encode()).hexdigest()
+        auth_hash = self._get_auth_hash(code)
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/schedule",
                 json={'schedules': schedules, 'auth_hash': auth_hash},
                 timeout=self.TIMEOUT
@@ -178,7 +184,7 @@ class FanDevice:
         auth_hash = hashlib.sha256(code.encode()).hexdigest()
         
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/auth",
                 json={'auth_hash': auth_hash},
                 timeout=self.TIMEOUT
@@ -0,0 +1,25 @@
+"""Shared keep-alive HTTP session for the ESP32 integrations (fan, temp, EC)."""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def _create_session() -> requests.Session:
+    """Build a pooled session so each poll reuses the TCP connection."""
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        # One retry covers a keep-alive the ESP32 dropped; offline devices still fail fast
+        max_retries=Retry(total=1, connect=0, backoff_factor=0)
+    )
+    s.mount('http://', adapter)
+    return s
+
+
+session = _create_session()
+
+
+def close_session():
+    """Close pooled connections (called on server shutdown)."""
+    session.close()
@@ -1,9 +1,29 @@
 """Tapo P110 Smart Plug integration for energy monitoring."""
+import json
+import logging
 import asyncio
-from datetime import datetime, date
+import time
+from collections import defaultdict
+from datetime import datetime, date, timedelta
 from typing import Optional
 import os
 
+logger = logging.getLogger(__name__)
+
+try:
+    # get_status runs on one of eventlet's tpool OS threads while the hub
+    # reads the same history, so the lock must be a real thread lock
+    from eventlet.patcher import original
+    threading = original('threading')
+except ImportError:
+    import threading
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     from tapo import ApiClient
     from tapo.requests import EnergyDataInterval
@@ -16,27 +36,44 @@ except ImportError:
 class TapoDevice:
     """Interface for Tapo P110 smart plug with energy monitoring."""
     
+    STALE_MAX_AGE = 600  # seconds the last good status may stand in for a failed poll
+    TIMEOUT = 3  # seconds per batch of plug requests (login, live readings, backfill)
+    # Whole poll, login and retry included; below the app's DEVICE_POLL_TIMEOUT (8s)
+    # so the worker thread is free again before the hub gives up on it
+    POLL_BUDGET = 6
+    PERSIST_INTERVAL = 300  # seconds between history file rewrites while data keeps changing
+    
     def __init__(self, email: Optional[str] = None, password: Optional[str] = None, 
                  ip_address: Optional[str] = None):
         self.email = email or os.getenv('TAPO_EMAIL')
         self.password = password or os.getenv('TAPO_PASSWORD')
         self.ip = ip_address or os.getenv('TAPO_DEVICE_IP')
+        self.kwh_price = float(os.getenv('KWH_PRICE', '0.25'))
+        self.currency = os.getenv('CURRENCY_SYMBOL', '€')
         self.last_state: Optional[bool] = None
         self.on_since: Optional[datetime] = None
+        self._last_good = None  # (monotonic time, status) of the last successful poll
+        self._client = None
+        self._device = None  # logged-in P110 handle, reused across polls
+        self._poll_lock = threading.Lock()  # held for the duration of a poll
         
         # Persistence
         self.history_file = 'energy_history.json'
         self.cached_history = []  # latest 7d for dashboard tiles
         self.all_history = {}     # date-keyed dict of ALL accumulated daily data
+        self.monthly_kwh = defaultdict(float)  # 'YYYY-MM' -> kWh, kept in step with all_history
+        self.yearly_kwh = defaultdict(float)   # 'YYYY' -> kWh, likewise
+        self._dirty = False  # all_history has changes not yet written to disk
+        self._last_persist = 0.0
+        self._lock = threading.RLock()  # guards all_history, the running totals and the file
         self.load_history()
         
     def load_history(self):
         """Load cached history from file."""
         if os.path.exists(self.history_file):
             try:
-                import json
-                with open(self.history_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.history_file, 'rb') as f:
+                    data = orjson.loads(f.read()) if ORJSON_AVAILABLE else json.load(f)
                     self.cached_history = data.get('history_7d', [])
                     # Load accumulated history (date -> {kwh, cost})
                     self.all_history = data.get('all_history', {})
@@ -48,115 +85,135 @@ class TapoDevice:
                                 'cost': entry['cost']
                             }
             except Exception as e:
-                print(f"[TAPO] Error loading history cache: {e}")
+                logger.error(f"[TAPO] Error loading history cache: {e}")
+        self._rebuild_totals()
+
+    def _rebuild_totals(self):
+        """Recompute the per-month and per-year kWh totals from the daily store."""
+        self.monthly_kwh.clear()
+        self.yearly_kwh.clear()
+        for day_str, data in self.all_history.items():
+            self.monthly_kwh[day_str[:7]] += data['kwh']
+            self.yearly_kwh[day_str[:4]] += data['kwh']
+
+    def _set_day(self, date_str, kwh, cost):
+        """Store one day's data and adjust its month's and year's running totals."""
+        with self._lock:
+            delta = kwh
+            previous = self.all_history.get(date_str)
+            if previous is not None:
+                if previous['kwh'] == kwh and previous['cost'] == cost:
+                    return
+                delta -= previous['kwh']
+            self.all_history[date_str] = {'kwh': kwh, 'cost': cost}
+            self._dirty = True
+            self.monthly_kwh[date_str[:7]] += delta
+            self.yearly_kwh[date_str[:4]] += delta
 
     def save_history(self, history):
-        """Save history to file, merging new daily data into accumulated history."""
-        try:
-            import json
-            # Merge new entries into all_history by date
+        """Merge fetched daily data into the accumulated history.
+
+        Goes through _set_day rather than a dict.update so the running month
+        and year totals stay in step; the file is written by _maybe_persist.
+        """
+        with self._lock:
             for entry in history:
-                self.all_history[entry['date']] = {
-                    'kwh': entry['kwh'],
-                    'cost': entry['cost']
-                }
-            self._persist()
-            self.cached_history = history
-        except Exception as e:
-            print(f"[TAPO] Error saving history cache: {e}")
+                self._set_day(entry['date'], entry['kwh'], entry['cost'])
+        self.cached_history = history
 
     def record_daily(self, date_str, kwh, kwh_price):
         """Record a single day's energy data into the accumulated store."""
-        current_entry = self.all_history.get(date_str, {'kwh': -1})
-        
-        # Prevent daily rollover race condition:
-        # If plug time is slightly ahead of server time at midnight,
-        # plug returns 0.0 (new day) while server still uses yesterday's date.
-        # This would overwrite yesterday's ~2.0kWh with 0.0.
-        if kwh < current_entry['kwh']:
-            # Log only if the drop is significant (> 0.1 kWh) to avoid log spam on minor glitches
-            if current_entry['kwh'] - kwh > 0.1:
-                print(f"[TAPO] Ignored daily kwh drop for {date_str}: {current_entry['kwh']} -> {kwh} (Rollover protection)")
-            return
-
-        self.all_history[date_str] = {
-            'kwh': round(kwh, 3),
-            'cost': round(kwh * kwh_price, 2)
-        }
-        self._persist()
+        with self._lock:
+            current_entry = self.all_history.get(date_str, {'kwh': -1})
+            
+            # Prevent daily rollover race condition:
+            # If plug time is slightly ahead of server time at midnight,
+            # plug returns 0.0 (new day) while server still uses yesterday's date.
+            # This would overwrite yesterday's ~2.0kWh with 0.0.
+            if kwh < current_entry['kwh']:
+                # Log only if the drop is significant (> 0.1 kWh) to avoid log spam on minor glitches
+                if current_entry['kwh'] - kwh > 0.1:
+                    logger.warning(f"[TAPO] Ignored daily kwh drop for {date_str}: {current_entry['kwh']} -> {kwh} (Rollover protection)")
+                return
+
+            self._set_day(date_str, round(kwh, 3), round(kwh * kwh_price, 2))
+    
+    def _maybe_persist(self):
+        """Write pending changes if the last write is older than PERSIST_INTERVAL.
+
+        Today's reading changes on almost every poll, so writing on each one
+        would rewrite the whole file every few seconds.
+        """
+        if self._dirty and time.monotonic() - self._last_persist >= self.PERSIST_INTERVAL:
+            self._persist()
+    
+    def flush(self):
+        """Write pending changes now (called on server shutdown)."""
+        if self._dirty:
+            self._persist()
     
     def _persist(self):
         """Write all_history to disk."""
-        try:
-            import json
-            # Sort history by date key for consistent file order
-            sorted_history = dict(sorted(self.all_history.items()))
-            
-            with open(self.history_file, 'w') as f:
-                json.dump({
+        with self._lock:  # also keeps flush() and a poll from sharing the temp file
+            self._last_persist = time.monotonic()
+            try:
+                data = {
                     'updated': datetime.now().isoformat(),
-                    'all_history': sorted_history
-                }, f, indent=2)
-        except Exception as e:
-            print(f"[TAPO] Error persisting history: {e}")
+                    'all_history': self.all_history
+                }
+                tmp_file = self.history_file + '.tmp'
+                # Keys sorted so the days are in date order in the file
+                with open(tmp_file, 'wb') as f:
+                    if ORJSON_AVAILABLE:
+                        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+                    else:
+                        f.write(json.dumps(data, indent=2, sort_keys=True).encode('utf-8'))
+                os.replace(tmp_file, self.history_file)
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"[TAPO] Error persisting history: {e}")
 
     def get_history_range(self, days=7):
         """Get daily history for the last N days from the accumulated store."""
+        start = date.today() - timedelta(days=days - 1)
         result = []
-        for i in range(days):
-            day = date.today() - relativedelta(days=days-1-i)
-            day_str = day.isoformat()
-            if day_str in self.all_history:
-                result.append({
-                    'date': day_str,
-                    'kwh': self.all_history[day_str]['kwh'],
-                    'cost': self.all_history[day_str]['cost']
-                })
+        with self._lock:
+            for i in range(days):
+                day_str = (start + timedelta(days=i)).isoformat()
+                entry = self.all_history.get(day_str)
+                if entry is not None:
+                    result.append({'date': day_str, 'kwh': entry['kwh'], 'cost': entry['cost']})
         return result
 
     def get_month_total(self, kwh_price=None):
-        """Calculate current month's total from daily records."""
-        month_prefix = date.today().strftime('%Y-%m')
-        total_kwh = 0
-        for day_str, data in self.all_history.items():
-            if day_str.startswith(month_prefix):
-                total_kwh += data['kwh']
-        price = kwh_price or float(os.getenv('KWH_PRICE', '0.25'))
+        """Current month's total from the running monthly sums."""
+        total_kwh = self.monthly_kwh.get(date.today().strftime('%Y-%m'), 0)
+        price = self.kwh_price if kwh_price is None else kwh_price
         return round(total_kwh, 3), round(total_kwh * price, 2)
 
     def get_year_total(self, kwh_price=None):
-        """Calculate current year's total from daily records."""
-        year_prefix = str(date.today().year)
-        total_kwh = 0
-        for day_str, data in self.all_history.items():
-            if day_str.startswith(year_prefix):
-                total_kwh += data['kwh']
-        price = kwh_price or float(os.getenv('KWH_PRICE', '0.25'))
+        """Current year's total from the running yearly sums."""
+        total_kwh = self.yearly_kwh.get(str(date.today().year), 0)
+        price = self.kwh_price if kwh_price is None else kwh_price
         return round(total_kwh, 3), round(total_kwh * price, 2)
 
     def get_monthly_breakdown(self, kwh_price=None):
-        """Group daily data by month for the stats page chart."""
-        from collections import defaultdict
-        months = defaultdict(float)
-        for day_str, data in self.all_history.items():
-            month_key = day_str[:7]  # 'YYYY-MM'
-            months[month_key] += data['kwh']
-        
-        price = kwh_price or float(os.getenv('KWH_PRICE', '0.25'))
-        result = []
-        for month_key in sorted(months.keys()):
-            kwh = months[month_key]
-            result.append({
-                'month': month_key,
-                'kwh': round(kwh, 3),
-                'cost': round(kwh * price, 2)
-            })
-        return result
+        """Monthly totals for the stats page chart (maintained as days are recorded)."""
+        price = self.kwh_price if kwh_price is None else kwh_price
+        with self._lock:
+            months = sorted(self.monthly_kwh.items())
+        # Still sorted: backfills can add a month before the ones already seen
+        return [
+            {'month': month_key, 'kwh': round(kwh, 3), 'cost': round(kwh * price, 2)}
+            for month_key, kwh in months
+        ]
 
     def get_all_history(self):
         """Return full accumulated history sorted by date."""
+        with self._lock:
+            days = sorted(self.all_history.items())
         result = []
-        for date_str, data in sorted(self.all_history.items()):
+        for date_str, data in days:
             result.append({
                 'date': date_str,
                 'kwh': data['kwh'],
@@ -164,6 +221,53 @@ class TapoDevice:
             })
         return result
 
+    def _batch_timeout(self, deadline):
+        """Seconds the next batch may take: TIMEOUT, cut short by the poll deadline."""
+        remaining = min(self.TIMEOUT, deadline - time.monotonic())
+        if remaining <= 0:
+            raise asyncio.TimeoutError(f'poll took longer than {self.POLL_BUDGET}s')
+        return remaining
+
+    async def _get_device(self, deadline=None):
+        """Connect to the plug once and reuse the logged-in handle on later polls.
+
+        The handle is backed by the library's own runtime, not the event loop,
+        so it outlives the asyncio.run() of the poll that created it.
+        """
+        if self._device is None:
+            if self._client is None:
+                self._client = ApiClient(self.email, self.password)
+            if deadline is None:
+                self._device = await self._client.p110(self.ip)
+            else:
+                timeout = self._batch_timeout(deadline)
+                self._device = await asyncio.wait_for(self._client.p110(self.ip), timeout)
+        return self._device
+
+    async def _read_live(self, device, deadline):
+        """Device info, current power and today's usage, requested concurrently."""
+        timeout = self._batch_timeout(deadline)
+        return await asyncio.wait_for(asyncio.gather(
+            device.get_device_info(), device.get_current_power(), device.get_energy_usage()
+        ), timeout)
+
+    def _fallback_status(self, error_msg):
+        """Status for a poll that produced no fresh data."""
+        # Ride out a cloud blip on the last known state rather than blanking the tile
+        if self._last_good and time.monotonic() - self._last_good[0] < self.STALE_MAX_AGE:
+            return {**self._last_good[1], 'stale': True, 'error': f'[TAPO] {error_msg}'}
+        
+        # Return cached data if available (fallback)
+        return {
+            'available': False,
+            'device': 'Tapo Energy Monitor',
+            'error': f'[TAPO] {error_msg}',
+            'ip': self.ip,
+            # Return cached history so UI isn't empty
+            'history_7d': self.cached_history,
+            'currency': self.currency
+        }
+
     async def get_status(self) -> dict:
         """Get current status and energy data from Tapo P110."""
         if not TAPO_AVAILABLE:
@@ -187,24 +291,39 @@ class TapoDevice:
                 'device': 'Tapo Energy Monitor'
             }
         
+        # A poll the app already gave up on may still be running on another
+        # worker thread; answer from the last good status instead of piling on
+        if not self._poll_lock.acquire(blocking=False):
+            return self._fallback_status('previous poll still running')
+        try:
+            return await self._poll()
+        finally:
+            self._poll_lock.release()
+
+    async def _poll(self):
+        """Read the plug and backfill history within POLL_BUDGET seconds."""
+        deadline = time.monotonic() + self.POLL_BUDGET
         try:
-            client = ApiClient(self.email, self.password)
-            device = await client.p110(self.ip)
+            reused = self._device is not None
+            device = await self._get_device(deadline)
             
-            # Get device info for on/off state
-            device_info = await device.get_device_info()
+            # On/off state, current power (watts) and energy usage (today/month)
+            try:
+                device_info, current_power_result, energy_usage = await self._read_live(device, deadline)
+            except Exception:
+                if not reused:
+                    raise
+                # The plug may have dropped the old session - log in again once,
+                # if the budget still allows it
+                self._device = None
+                device = await self._get_device(deadline)
+                device_info, current_power_result, energy_usage = await self._read_live(device, deadline)
             is_on = device_info.device_on
-            
-            # Get current power (returns watts directly)
-            current_power_result = await device.get_current_power()
             current_power_w = current_power_result.current_power if hasattr(current_power_result, 'current_power') else 0
             
-            # Get energy usage (today/month)
-            energy_usage = await device.get_energy_usage()
-            
-            # Get price config from env
-            kwh_price = float(os.getenv('KWH_PRICE', '0.25'))
-            currency = os.getenv('CURRENCY_SYMBOL', '€')
+            # Price config (read from env once in __init__)
+            kwh_price = self.kwh_price
+            currency = self.currency
             
             # Convert Wh to kWh (live API values)
             today_kwh = (energy_usage.today_energy / 1000) if hasattr(energy_usage, 'today_energy') else 0
@@ -225,43 +344,44 @@ class TapoDevice:
             self.record_daily(date.today().isoformat(), today_kwh, kwh_price)
             
             # --- Try to backfill from API (best-effort, non-blocking) ---
+            # The daily and monthly requests are independent, so send them together
+            year_start = date(datetime.now().year, 1, 1)
             try:
-                api_history = await self.get_daily_history(kwh_price)
-                if api_history:
-                    for entry in api_history:
-                        if entry['date'] not in self.all_history:
-                            self.all_history[entry['date']] = {
-                                'kwh': entry['kwh'],
-                                'cost': entry['cost']
-                            }
-                    self._persist()
-            except Exception as e:
-                print(f"[TAPO] Daily history backfill failed (non-critical): {e}")
+                timeout = self._batch_timeout(deadline)
+                api_history, energy_data = await asyncio.wait_for(asyncio.gather(
+                    self.get_daily_history(kwh_price, device),
+                    device.get_energy_data(EnergyDataInterval.Monthly, year_start),
+                    return_exceptions=True
+                ), timeout)
+            except asyncio.TimeoutError as e:
+                api_history = energy_data = e
+            
+            # get_daily_history merges what it fetched into all_history itself
+            if isinstance(api_history, Exception):
+                logger.warning(f"[TAPO] Daily history backfill failed (non-critical): {api_history!r}")
             
             # Also try monthly API backfill to seed historical months
             try:
-                year_start = date(datetime.now().year, 1, 1)
-                energy_data = await device.get_energy_data(EnergyDataInterval.Monthly, year_start)
+                if isinstance(energy_data, Exception):
+                    raise energy_data
                 if hasattr(energy_data, 'data') and energy_data.data:
-                    print(f"[TAPO] Monthly API returned {len(energy_data.data)} months: {energy_data.data}")
+                    logger.debug("[TAPO] Monthly API returned %d months: %s", len(energy_data.data), energy_data.data)
                     # Backfill: for each month with data, spread it into a single "month-summary" entry
                     # This helps when we have no daily data for past months
-                    for month_idx, month_wh in enumerate(energy_data.data):
-                        if month_wh > 0:
-                            month_date = year_start + relativedelta(months=month_idx)
-                            # Use the 1st of each month as a summary entry if we have no daily data for that month
-                            month_prefix = month_date.strftime('%Y-%m')
-                            has_daily_data = any(d.startswith(month_prefix) for d in self.all_history)
-                            if not has_daily_data:
-                                summary_key = f"{month_prefix}-01"
-                                month_kwh_val = month_wh / 1000
-                                self.all_history[summary_key] = {
-                                    'kwh': round(month_kwh_val, 3),
-                                    'cost': round(month_kwh_val * kwh_price, 2)
-                                }
-                    self._persist()
+                    with self._lock:
+                        for month_idx, month_wh in enumerate(energy_data.data):
+                            if month_wh > 0:
+                                month_date = year_start + relativedelta(months=month_idx)
+                                # Use the 1st of each month as a summary entry if we have no daily data for that month
+                                month_prefix = month_date.strftime('%Y-%m')
+                                if month_prefix not in self.monthly_kwh:
+                                    summary_key = f"{month_prefix}-01"
+                                    month_kwh_val = month_wh / 1000
+                                    self._set_day(summary_key, round(month_kwh_val, 3),
+                                                  round(month_kwh_val * kwh_price, 2))
             except Exception as e:
-                print(f"[TAPO] Monthly backfill failed (non-critical): {e}")
+                logger.warning(f"[TAPO] Monthly backfill failed (non-critical): {e}")
+            self._maybe_persist()
 
             # --- All displayed values derived from daily store ---
             month_kwh, month_cost = self.get_month_total(kwh_price)
@@ -269,7 +389,7 @@ class TapoDevice:
             history_7d = self.get_history_range(7)
             monthly_history = self.get_monthly_breakdown(kwh_price)
 
-            return {
+            status = {
                 'available': True,
                 'device': 'Tapo Energy Monitor',
                 'name': device_info.nickname if hasattr(device_info, 'nickname') else 'P110',
@@ -289,31 +409,24 @@ class TapoDevice:
                 'history_7d': history_7d,
                 'monthly_history': monthly_history
             }
+            self._last_good = (time.monotonic(), status)
+            return status
             
         except Exception as e:
-            error_msg = str(e)
+            self._device = None  # reconnect on the next poll
+            error_msg = str(e) or type(e).__name__  # timeouts carry no message
             if 'password' in error_msg.lower() or 'auth' in error_msg.lower() or 'incorrect' in error_msg.lower():
-                print(f"[TAPO] Authentication failed: {error_msg}")
+                logger.error(f"[TAPO] Authentication failed: {error_msg}")
             
-            # Return cached data if available (fallback)
-            return {
-                'available': False,
-                'device': 'Tapo Energy Monitor',
-                'error': f'[TAPO] {error_msg}',
-                'ip': self.ip,
-                # Return cached history so UI isn't empty
-                'history_7d': self.cached_history,
-                'currency': os.getenv('CURRENCY_SYMBOL', '€')
-            }
+            return self._fallback_status(error_msg)
 
-    async def get_daily_history(self, kwh_price):
+    async def get_daily_history(self, kwh_price, device=None):
         """Fetch last 7 days of energy data."""
         try:
-            client = ApiClient(self.email, self.password)
-            device = await client.p110(self.ip)
+            device = device or await self._get_device()
             
             end_date = date.today()
-            start_date = end_date - relativedelta(days=6) # 7 days inclusive
+            start_date = end_date - timedelta(days=6) # 7 days inclusive
             
             # Fetch Daily data
             try:
@@ -348,7 +461,7 @@ class TapoDevice:
             # Fallback: raw integer array in result.data (common format)
             if not history and hasattr(result, 'data') and result.data:
                 for i, energy_wh in enumerate(result.data):
-                    day_date = start_date + relativedelta(days=i)
+                    day_date = start_date + timedelta(days=i)
                     kwh = energy_wh / 1000
                     history.append({
                         'date': day_date.isoformat(),
@@ -366,7 +479,7 @@ class TapoDevice:
             return history if history else (self.cached_history or [])
             
         except Exception as e:
-            print(f"[TAPO] History fetch failed: {e}")
+            logger.error(f"[TAPO] History fetch failed: {e}")
             return self.cached_history or []
 
 
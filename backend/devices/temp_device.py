@@ -1,7 +1,10 @@
 """Temperature sensor device interface for ESP32 DS18B20 sensors."""
+import hashlib
+import logging
 import os
-import requests
-from datetime import datetime
+from .http_session import session
+
+logger = logging.getLogger(__name__)
 
 
 class TempDevice:
@@ -15,7 +18,7 @@ class TempDevice:
     def get_status(self):
         """Get current temperature readings from all sensors."""
         try:
-            response = requests.get(
+            response = session.get(
                 f'http://{self.ip}/status',
                 timeout=self.timeout
             )
@@ -29,7 +32,7 @@ class TempDevice:
                     'ip': self.ip
                 }
         except Exception as e:
-            print(f'[TEMP] Error getting status: {e}')
+            logger.error(f'[TEMP] Error getting status: {e}')
         
         return {
             'available': False,
@@ -41,7 +44,7 @@ class TempDevice:
     def detect_sensors(self):
         """Detect all sensors on the OneWire bus."""
         try:
-            response = requests.get(
+            response = session.get(
                 f'http://{self.ip}/detect',
                 timeout=self.timeout
             )
@@ -52,7 +55,7 @@ class TempDevice:
                     'sensors': data.get('sensors', [])
                 }
         except Exception as e:
-            print(f'[TEMP] Error detecting sensors: {e}')
+            logger.error(f'[TEMP] Error detecting sensors: {e}')
         
         return {
             'success': False,
@@ -63,7 +66,7 @@ class TempDevice:
     def set_name(self, address, name):
         """Set sensor name."""
         try:
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/name",
                 json={'address': address, 'name': name},
                 timeout=self.timeout
@@ -71,16 +74,15 @@ class TempDevice:
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"[TEMP] Error setting sensor name: {e}")
+            logger.error(f"[TEMP] Error setting sensor name: {e}")
             return {'success': False, 'error': str(e)}
     
     def set_pin(self, pin, auth_code='4444'):
         """Set OneWire bus pin (requires ESP32 restart to take effect)."""
         try:
-            import hashlib
             auth_hash = hashlib.sha256(auth_code.encode()).hexdigest()
             
-            response = requests.post(
+            response = session.post(
                 f"{self._get_base_url()}/temp_pin",
                 json={'pin': pin, 'auth_hash': auth_hash},
                 timeout=self.timeout
@@ -88,7 +90,7 @@ class TempDevice:
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"[TEMP] Error setting pin: {e}")
+            logger.error(f"[TEMP] Error setting pin: {e}")
             return {'success': False, 'error': str(e)}
 
 
@@ -1,5 +1,6 @@
 """Wiz Smart Socket integration for grow lights and heater."""
 import asyncio
+import time
 from datetime import datetime
 from typing import Optional
 import os
@@ -13,11 +14,15 @@ except ImportError:
 
 class WizDevice:
     """Interface for Wiz smart socket/light."""
+
+    TIMEOUT = 5  # seconds; frees the worker thread if the socket stops answering UDP
+    STATE_MAX_AGE = 30  # seconds toggle() trusts last_state before asking the socket
     
     def __init__(self, ip_address: Optional[str] = None, device_name: str = 'Wiz Device'):
         self.ip = ip_address
         self.device_name = device_name
         self.last_state: Optional[bool] = None
+        self._state_time = 0.0  # monotonic time last_state was confirmed
         self.on_since: Optional[datetime] = None
         
     async def _get_status_async(self) -> dict:
@@ -51,6 +56,7 @@ class WizDevice:
                 self.on_since = None
                 
             self.last_state = is_on
+            self._state_time = time.monotonic()
             
             uptime_seconds = None
             if self.on_since:
@@ -89,6 +95,7 @@ class WizDevice:
             light = wizlight(self.ip)
             await light.turn_on(PilotBuilder())
             self.last_state = True
+            self._state_time = time.monotonic()
             if self.on_since is None:
                 self.on_since = datetime.now()
             return {'success': True}
@@ -110,6 +117,7 @@ class WizDevice:
             light = wizlight(self.ip)
             await light.turn_off()
             self.last_state = False
+            self._state_time = time.monotonic()
             self.on_since = None
             return {'success': True}
         except Exception as e:
@@ -127,9 +135,16 @@ class WizDevice:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
-                return loop.run_until_complete(self._get_status_async())
+                return loop.run_until_complete(asyncio.wait_for(self._get_status_async(), self.TIMEOUT))
             finally:
                 loop.close()
+        except asyncio.TimeoutError:
+            return {
+                'available': False,
+                'device': self.device_name,
+                'error': f'[WIZ] No response within {self.TIMEOUT}s',
+                'ip': self.ip
+            }
         except Exception as e:
             return {
                 'available': False,
@@ -144,9 +159,11 @@ class WizDevice:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
-                return loop.run_until_complete(self._turn_on_async())
+                return loop.run_until_complete(asyncio.wait_for(self._turn_on_async(), self.TIMEOUT))
             finally:
                 loop.close()
+        except asyncio.TimeoutError:
+            return {'success': False, 'error': f'No response within {self.TIMEOUT}s'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -156,12 +173,24 @@ class WizDevice:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
-                return loop.run_until_complete(self._turn_off_async())
+                return loop.run_until_complete(asyncio.wait_for(self._turn_off_async(), self.TIMEOUT))
             finally:
                 loop.close()
+        except asyncio.TimeoutError:
+            return {'success': False, 'error': f'No response within {self.TIMEOUT}s'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def toggle(self) -> dict:
+        """Flip the socket from its last known state (kept fresh by the status polls).
+
+        Only asks the socket first if that state is older than STATE_MAX_AGE,
+        so a toggle is usually one round trip instead of two.
+        """
+        if self.last_state is None or time.monotonic() - self._state_time > self.STATE_MAX_AGE:
+            self.get_status()
+        return self.turn_off() if self.last_state else self.turn_on()
+
 
 # Singleton instances
 _wiz_light_instance: Optional[WizDevice] = None
@@ -0,0 +1,70 @@
+"""Logging setup - records go through a queue so callers never block on stdout."""
+import atexit
+import logging
+import os
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    # Records also come from tpool's OS threads, so the queue, the handler
+    # lock and the listener must be real thread primitives, not green ones
+    from eventlet.patcher import original
+    queue = original('queue')
+    threading = original('threading')
+except ImportError:
+    import queue
+    import threading
+
+_listener = None
+
+
+class _ThreadQueueHandler(QueueHandler):
+    """QueueHandler whose lock is a real (unpatched) RLock."""
+
+    def createLock(self):
+        self.lock = threading.RLock()
+
+
+class _ThreadQueueListener(QueueListener):
+    """QueueListener that drains the queue on a real OS thread."""
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+
+def setup_logging():
+    """Route the root logger through a QueueHandler drained by a QueueListener."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s', '%H:%M:%S'))
+    stream.lock = threading.RLock()  # used by the listener thread and by _drain at exit
+
+    records = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers = [_ThreadQueueHandler(records)]
+
+    _listener = _ThreadQueueListener(records, stream)
+    _listener.start()
+    atexit.register(_drain)
+    return _listener
+
+
+def _drain():
+    """Write out records still queued at interpreter exit (the listener can't be joined then)."""
+    if _listener is not None:
+        while not _listener.queue.empty():
+            _listener.handle(_listener.queue.get_nowait())
+
+
+def stop_logging():
+    """Flush queued records and stop the listener (called on server shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
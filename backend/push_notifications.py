@@ -4,15 +4,19 @@ Web Push Notification Module
 Handles VAPID key generation, subscription storage, and push notifications.
 """
 
+import logging
 import json
 import os
 import base64
 from pathlib import Path
+import requests
 from pywebpush import webpush, WebPushException
 from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 
+logger = logging.getLogger(__name__)
+
 # File paths
 DATA_DIR = Path(__file__).parent.parent / 'data'
 VAPID_FILE = DATA_DIR / 'vapid_keys.json'
@@ -24,6 +28,16 @@ VAPID_CLAIMS = {
     "sub": "mailto:admin@smarttent.local"
 }
 
+# Seconds to wait on a push service before giving up on that subscription
+PUSH_TIMEOUT = 10
+
+# Keep-alive connections to the push services (FCM, Mozilla, Apple) so
+# repeat alerts skip the TLS handshake
+_push_session = requests.Session()
+
+# applicationServerKey served to the frontend; set on first use or when keys are generated
+_public_key = None
+
 
 def ensure_data_dir():
     """Ensure data directory exists."""
@@ -32,6 +46,7 @@ def ensure_data_dir():
 
 def get_vapid_keys():
     """Get or generate VAPID keys using cryptography directly."""
+    global _public_key
     ensure_data_dir()
     
     if VAPID_FILE.exists() and VAPID_PRIVATE_FILE.exists():
@@ -41,7 +56,7 @@ def get_vapid_keys():
                 if 'applicationServerKey' in keys:
                     return keys
         except (json.JSONDecodeError, KeyError, ValueError, Exception):
-            print("[PUSH] VAPID keys corrupted or invalid, regenerating...")
+            logger.error("[PUSH] VAPID keys corrupted or invalid, regenerating...")
             pass
     
     # Generate new ECDSA P-256 keys
@@ -75,14 +90,17 @@ def get_vapid_keys():
     with open(VAPID_FILE, 'w') as f:
         json.dump(keys, f, indent=2)
     
-    print(f"[PUSH] Generated new VAPID keys, saved to {VAPID_FILE} and {VAPID_PRIVATE_FILE}")
+    logger.info(f"[PUSH] Generated new VAPID keys, saved to {VAPID_FILE} and {VAPID_PRIVATE_FILE}")
+    _public_key = application_server_key
     return keys
 
 
 def get_public_key():
-    """Get the public VAPID key for frontend subscription."""
-    keys = get_vapid_keys()
-    return keys.get('applicationServerKey', '')
+    """Get the public VAPID key for frontend subscription (read from disk once)."""
+    global _public_key
+    if _public_key is None:
+        _public_key = get_vapid_keys().get('applicationServerKey', '')
+    return _public_key
 
 
 def load_subscriptions():
@@ -117,13 +135,13 @@ def add_subscription(subscription_info):
             # Update existing
             sub.update(subscription_info)
             save_subscriptions(subscriptions)
-            print(f"[PUSH] Updated existing subscription")
+            logger.info("[PUSH] Updated existing subscription")
             return True
     
     # Add new
     subscriptions.append(subscription_info)
     save_subscriptions(subscriptions)
-    print(f"[PUSH] Added new subscription (total: {len(subscriptions)})")
+    logger.info(f"[PUSH] Added new subscription (total: {len(subscriptions)})")
     return True
 
 
@@ -135,7 +153,7 @@ def remove_subscription(endpoint):
     
     if len(subscriptions) < original_count:
         save_subscriptions(subscriptions)
-        print(f"[PUSH] Removed subscription (remaining: {len(subscriptions)})")
+        logger.info(f"[PUSH] Removed subscription (remaining: {len(subscriptions)})")
         return True
     return False
 
@@ -171,7 +189,7 @@ def send_push_notification(title, body, tag=None):
     private_key_path = keys.get('private_key_path')
     if not private_key_path or not os.path.exists(private_key_path):
         # Fallback to regenerating if file missing
-        print("[PUSH] Private key file missing, regenerating...")
+        logger.error("[PUSH] Private key file missing, regenerating...")
         keys = get_vapid_keys()
         private_key_path = keys.get('private_key_path')
 
@@ -181,16 +199,18 @@ def send_push_notification(title, body, tag=None):
                 subscription_info=sub,
                 data=payload,
                 vapid_private_key=private_key_path,
-                vapid_claims=VAPID_CLAIMS
+                vapid_claims=VAPID_CLAIMS,
+                timeout=PUSH_TIMEOUT,
+                requests_session=_push_session
             )
             success_count += 1
         except WebPushException as e:
-            print(f"[PUSH] Failed to send: {e}")
+            logger.error(f"[PUSH] Failed to send: {e}")
             # If subscription is invalid (410 Gone), mark for removal
             if e.response and e.response.status_code in (404, 410):
                 failed_endpoints.append(sub.get('endpoint'))
         except Exception as e:
-            print(f"[PUSH] Error: {e}")
+            logger.error(f"[PUSH] Failed to send: {e}")
     
     # Clean up invalid subscriptions
     if failed_endpoints:
@@ -198,6 +218,6 @@ def send_push_notification(title, body, tag=None):
             remove_subscription(endpoint)
     
     if success_count > 0:
-        print(f"[PUSH] Sent '{title}' to {success_count} devices")
+        logger.info(f"[PUSH] Sent '{title}' to {success_count} devices")
     
     return success_count
@@ -1,9 +1,18 @@
+import logging
 import json
 import os
 import time
 from collections import deque
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
 HISTORY_FILE = 'runtime_history.json'
 MAX_HISTORY_SECONDS = 365 * 24 * 3600  # 1 Year (365 days)
 
@@ -15,33 +24,52 @@ class RuntimeTracker:
             'on_seconds': 0,
             'start_time': int(time.time())
         }
+        self._metrics = (None, None)  # (history key, metrics) from the last get_metrics
         self.load()
 
     def load(self):
         """Load history from file."""
         if os.path.exists(HISTORY_FILE):
             try:
-                with open(HISTORY_FILE, 'r') as f:
-                    data = json.load(f)
+                with open(HISTORY_FILE, 'rb') as f:
+                    data = orjson.loads(f.read()) if ORJSON_AVAILABLE else json.load(f)
                     # Convert list back to deque
                     self.history = deque(data.get('history', []))
                     self.all_time = data.get('all_time', self.all_time)
-                    print(f"[RUNTIME] Loaded history: {len(self.history)} samples")
+                    logger.info(f"[RUNTIME] Loaded history: {len(self.history)} samples")
             except Exception as e:
-                print(f"[RUNTIME] Error loading history: {e}")
+                logger.error(f"[RUNTIME] Error loading history: {e}")
 
-    def save(self):
+    def save(self, fsync=True):
         """Save history to file."""
+        self.write(self.snapshot(), fsync)
+
+    def snapshot(self):
+        """Prune and copy the state to save (call from the thread that calls update)."""
+        # Prune before saving to keep file size managed
+        self.prune()
+        return {
+            'history': list(self.history),
+            'all_time': dict(self.all_time)
+        }
+
+    def write(self, data, fsync=False):
+        """Write a snapshot atomically (temp file + rename); safe to run on another thread."""
+        tmp_file = HISTORY_FILE + '.tmp'
         try:
-            # Prune before saving to keep file size managed
-            self.prune()
-            with open(HISTORY_FILE, 'w') as f:
-                json.dump({
-                    'history': list(self.history),
-                    'all_time': self.all_time
-                }, f)
+            # A year of samples is ~500k pairs: orjson encodes it in a fraction
+            # of the time json.dump holds the GIL for
+            with open(tmp_file, 'wb') as f:
+                if ORJSON_AVAILABLE:
+                    f.write(orjson.dumps(data))
+                else:
+                    f.write(json.dumps(data).encode('utf-8'))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, HISTORY_FILE)
         except Exception as e:
-            print(f"[RUNTIME] Error saving history: {e}")
+            logger.error(f"[RUNTIME] Error saving history: {e}")
 
     def prune(self):
         """Remove samples older than MAX_HISTORY_SECONDS."""
@@ -97,6 +125,17 @@ class RuntimeTracker:
                 self.all_time['on_seconds'] += delta
 
     def get_metrics(self):
+        """Day, Week, and All-Time duty cycles, recomputed only when a sample is added.
+
+        Samples are stored at most once a minute but this is called on every
+        poll, and each computation scans the whole (up to a year) history.
+        """
+        key = (len(self.history), self.history[-1] if self.history else None)
+        if self._metrics[0] != key:
+            self._metrics = (key, self._compute_metrics())
+        return self._metrics[1]
+
+    def _compute_metrics(self):
         """Calculate Day, Week, and All-Time duty cycles."""
         now = time.time()
         
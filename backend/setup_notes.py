@@ -1,37 +1,51 @@
 """Setup change notes — persist dated annotations like 'added insulation' for comparison."""
+import logging
 import json
 import os
 import time
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 NOTES_FILE = os.path.join(os.path.dirname(__file__), 'setup_notes.json')
 
+# Sorted notes list, dropped whenever the file is rewritten
+_sorted_notes = None
+
 
 def load_notes():
     """Load all setup change notes."""
-    if os.path.exists(NOTES_FILE):
-        try:
-            with open(NOTES_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[NOTES] Error loading: {e}")
+    try:
+        with open(NOTES_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"[NOTES] Error loading: {e}")
     return []
 
 
 def save_notes(notes):
     """Save notes list to file."""
+    global _sorted_notes
+    _sorted_notes = None
     try:
-        with open(NOTES_FILE, 'w') as f:
+        tmp_file = NOTES_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
             json.dump(notes, f, indent=2)
+        os.replace(tmp_file, NOTES_FILE)
     except Exception as e:
-        print(f"[NOTES] Error saving: {e}")
+        logger.error(f"[NOTES] Error saving: {e}")
 
 
 def get_notes():
-    """Return all notes sorted by date."""
-    notes = load_notes()
-    notes.sort(key=lambda n: n.get('date', ''))
-    return notes
+    """Return all notes sorted by date (cached; callers must not modify the list)."""
+    global _sorted_notes
+    if _sorted_notes is None:
+        notes = load_notes()
+        notes.sort(key=lambda n: n.get('date', ''))
+        _sorted_notes = notes
+    return _sorted_notes
 
 
 def add_note(date_str, text):
@@ -0,0 +1,146 @@
+"""Temperature history - append-only JSONL log with a 7-day in-memory window."""
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'temp_history.jsonl')
+LEGACY_FILE = os.path.join(os.path.dirname(__file__), 'temp_history.json')
+MAX_AGE = timedelta(days=7)
+# Ring-buffer cap: 7 days of 5-second poll ticks for up to 8 sensors
+MAX_READINGS = 7 * 17280 * 8
+COMPACT_INTERVAL = 3600  # seconds between rewrites that drop expired lines
+APPEND_INTERVAL = 60  # seconds of readings buffered in memory between appends
+
+
+class TempHistory:
+    """Sensor readings kept in memory; new ones are appended to the file as lines.
+
+    Readings are in chronological order, so expiry pops from the left and
+    range queries walk back from the right. The deque is bounded, so memory
+    stays flat even if readings arrive faster than expected. New readings
+    are appended in one batch per APPEND_INTERVAL rather than one write per
+    poll tick, and the file is only rewritten (without expired lines) once
+    per COMPACT_INTERVAL.
+    """
+
+    def __init__(self):
+        self.readings = deque(maxlen=MAX_READINGS)
+        self._pending = []  # readings not yet appended to the file
+        self._file = None
+        self._last_compact = time.monotonic()
+        self._last_append = self._last_compact
+        self.load()
+
+    def load(self):
+        """Load readings from the JSONL log, or migrate the old JSON list."""
+        try:
+            if os.path.exists(HISTORY_FILE):
+                with open(HISTORY_FILE, 'r') as f:
+                    for line in f:
+                        try:
+                            self.readings.append(json.loads(line))
+                        except ValueError:
+                            pass  # partial line from a power cut
+            elif os.path.exists(LEGACY_FILE):
+                with open(LEGACY_FILE, 'r') as f:
+                    self.readings.extend(json.load(f))
+                self.compact()
+                logger.info(f"[TEMP] Migrated {len(self.readings)} readings to {HISTORY_FILE}")
+        except Exception as e:
+            logger.error(f'[TEMP] Failed to load history: {e}')
+        self.prune()
+
+    def prune(self):
+        """Drop readings older than MAX_AGE."""
+        # Naive ISO timestamps sort the same as the datetimes they encode
+        cutoff = (datetime.now() - MAX_AGE).isoformat()
+        while self.readings and self.readings[0]['timestamp'] <= cutoff:
+            self.readings.popleft()
+
+    def compact(self):
+        """Rewrite the log with only the readings still in the window."""
+        self.prune()
+        self._pending.clear()  # the rewrite includes them
+        self.close()
+        tmp_file = HISTORY_FILE + '.tmp'
+        try:
+            with open(tmp_file, 'w') as f:
+                f.writelines(json.dumps(r) + '\n' for r in self.readings)
+            os.replace(tmp_file, HISTORY_FILE)
+        except Exception as e:
+            logger.error(f'[TEMP] Failed to save history: {e}')
+        self._last_compact = time.monotonic()
+
+    def add(self, sensor_address, temp_c, sensor_name=None):
+        """Record a reading; it reaches the file with the next batched append."""
+        reading = {
+            'timestamp': datetime.now().isoformat(),
+            'address': sensor_address,
+            'name': sensor_name,
+            'temp_c': temp_c
+        }
+        self.readings.append(reading)
+        self._pending.append(reading)
+        now = time.monotonic()
+        if now - self._last_compact > COMPACT_INTERVAL:
+            self.compact()
+        elif now - self._last_append >= APPEND_INTERVAL:
+            self.flush()
+        return reading
+
+    def flush(self):
+        """Append the buffered readings to the log as lines, no full rewrite."""
+        self._last_append = time.monotonic()
+        if not self._pending:
+            return
+        try:
+            if self._file is None:
+                self._file = open(HISTORY_FILE, 'a')
+            self._file.writelines(json.dumps(r) + '\n' for r in self._pending)
+            self._file.flush()
+        except Exception as e:
+            logger.error(f'[TEMP] Failed to save history: {e}')
+        self._pending.clear()
+
+    def since(self, cutoff):
+        """Readings newer than the cutoff datetime, oldest first."""
+        cutoff = cutoff.isoformat()
+        recent = []
+        for reading in reversed(self.readings):
+            if reading['timestamp'] <= cutoff:
+                break
+            recent.append(reading)
+        recent.reverse()
+        return recent
+
+    def series_since(self, cutoff):
+        """Readings newer than the cutoff grouped per sensor as parallel time/value lists.
+
+        Far smaller as JSON than the raw readings, which repeat every key
+        and the sensor address and name on each line.
+        """
+        series = {}
+        for reading in self.since(cutoff):
+            sensor = series.get(reading['address'])
+            if sensor is None:
+                sensor = series[reading['address']] = {
+                    'address': reading['address'],
+                    'name': reading.get('name'),
+                    't': [],
+                    'v': []
+                }
+            sensor['t'].append(reading['timestamp'])
+            sensor['v'].append(reading['temp_c'])
+        return list(series.values())
+
+    def close(self):
+        """Write buffered readings and close the append handle (reopened on the next append)."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
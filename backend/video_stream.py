@@ -0,0 +1,202 @@
+"""Shared ffmpeg MJPEG transcoder fanned out to every /video_feed viewer."""
+import logging
+import os
+import re
+import selectors
+import subprocess
+import threading
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_LENGTH = re.compile(rb'Content-length:\s*(\d+)', re.IGNORECASE)
+
+
+class _Subscriber:
+    """Per-viewer buffer of MJPEG parts; the oldest frame is dropped when full."""
+
+    def __init__(self, maxlen):
+        self.chunks = deque(maxlen=maxlen)
+        self.ready = threading.Event()
+        self.closed = False
+
+
+class MJPEGBroadcaster:
+    """Run a single ffmpeg process and copy its output to all subscribers.
+
+    ffmpeg is started by the first subscriber and stopped once the last
+    one has been gone for IDLE_GRACE seconds, so the camera only ever
+    sees one RTSP session no matter how many tabs are open.
+    """
+
+    BOUNDARY = b'--ffmpeg'
+    READ_SIZE = 65536
+    PIPE_SIZE = 262144  # room for a few frames so ffmpeg never waits on the reader
+    BUFFER_CHUNKS = 8  # whole frames per viewer
+    MAX_PART = 4 * 1024 * 1024  # flush unparseable output rather than buffer it forever
+    IDLE_GRACE = 10  # seconds
+    STALL_TIMEOUT = 15  # seconds without output before ffmpeg is considered hung
+
+    def __init__(self, rtsp_url):
+        self.rtsp_url = rtsp_url
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._process = None
+        self._stop_timer = None
+
+    def _build_cmd(self):
+        """ffmpeg command producing multipart JPEG (includes boundaries)."""
+        return [
+            'ffmpeg',
+            '-rtsp_transport', 'tcp',
+            '-fflags', 'nobuffer',    # Don't buffer input frames
+            '-flags', 'low_delay',
+            '-probesize', '32',       # Skip the multi-second stream probe
+            '-analyzeduration', '0',
+            '-i', self.rtsp_url,
+            '-an',                # Drop the camera's audio track
+            '-c:v', 'mjpeg',      # Transcode to MJPEG
+            '-q:v', '10',         # Quality
+            '-r', '15',           # Limit framerate
+            '-f', 'mpjpeg',       # Multipart JPEG format
+            '-boundary_tag', 'ffmpeg', # Custom boundary string
+            '-flush_packets', '1',     # Write each frame to the pipe as soon as it's encoded
+            '-'
+        ]
+
+    def _start(self):
+        """Start ffmpeg and its reader thread. Caller must hold the lock."""
+        self._process = subprocess.Popen(
+            self._build_cmd(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+        )
+        if fcntl is not None and hasattr(fcntl, 'F_SETPIPE_SZ'):
+            try:
+                fcntl.fcntl(self._process.stdout.fileno(), fcntl.F_SETPIPE_SZ, self.PIPE_SIZE)
+            except OSError:
+                pass  # above /proc/sys/fs/pipe-max-size, keep the default
+        threading.Thread(target=self._reader, args=(self._process,), daemon=True).start()
+
+    @staticmethod
+    def _kill(process):
+        """Kill ffmpeg and reap it so it doesn't linger as a zombie."""
+        process.kill()
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def _split_parts(self, buf):
+        """Pop complete multipart frames (boundary, headers, JPEG) off the front of buf."""
+        parts = []
+        while True:
+            head_end = buf.find(b'\r\n\r\n')
+            if head_end < 0:
+                break
+            match = _CONTENT_LENGTH.search(buf, 0, head_end)
+            if match is None:
+                # No length header: a part ends where the next boundary starts
+                end = buf.find(self.BOUNDARY, len(self.BOUNDARY))
+                if end < 0:
+                    break
+            else:
+                end = head_end + 4 + int(match.group(1)) + 2  # JPEG + trailing CRLF
+                if len(buf) < end:
+                    break
+            # Slice through a memoryview: one copy into the part, not two
+            with memoryview(buf) as view:
+                parts.append(bytes(view[:end]))
+            del buf[:end]  # bytearray drops a prefix without moving the rest
+        if not parts and len(buf) > self.MAX_PART:
+            parts.append(bytes(buf))
+            buf.clear()
+        return parts
+
+    def _reader(self, process):
+        """Copy ffmpeg stdout into every subscriber's buffer until it exits."""
+        fd = process.stdout.fileno()
+        # Non-blocking pipe + selector: the reader only wakes when there is
+        # data, so it never holds up the Socket.IO loop between frames
+        os.set_blocking(fd, False)
+        sel = selectors.DefaultSelector()
+        sel.register(fd, selectors.EVENT_READ)
+        buf = bytearray()
+        try:
+            while True:
+                if not sel.select(timeout=self.STALL_TIMEOUT):
+                    logger.error(f"[VIDEO] Stream error: no data from ffmpeg for {self.STALL_TIMEOUT}s")
+                    break
+                try:
+                    data = os.read(fd, self.READ_SIZE)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    break
+                buf += data
+                # Publish whole frames only, so a slow viewer that drops its
+                # oldest entry skips a frame instead of corrupting the stream
+                parts = self._split_parts(buf)
+                if not parts:
+                    continue
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for sub in subscribers:
+                    sub.chunks.extend(parts)
+                    sub.ready.set()
+        except Exception as e:
+            logger.error(f"[VIDEO] Stream error: {e}")
+        finally:
+            sel.close()
+            subscribers = []
+            with self._lock:
+                # ffmpeg died on its own (camera offline) - end the open streams
+                if self._process is process:
+                    self._process = None
+                    subscribers = list(self._subscribers)
+            for sub in subscribers:
+                sub.closed = True
+                sub.ready.set()
+            self._kill(process)
+
+    def _stop_if_idle(self):
+        """Stop ffmpeg if nobody re-subscribed during the grace period."""
+        with self._lock:
+            self._stop_timer = None
+            if self._subscribers or self._process is None:
+                return
+            process = self._process
+            self._process = None
+        self._kill(process)
+
+    def subscribe(self):
+        """Yield MJPEG chunks for one viewer until it disconnects or ffmpeg exits."""
+        sub = _Subscriber(self.BUFFER_CHUNKS)
+        try:
+            # Inside the try so a failed ffmpeg start (binary missing, camera
+            # busy) still unregisters this viewer
+            with self._lock:
+                self._subscribers.add(sub)
+                if self._stop_timer is not None:
+                    self._stop_timer.cancel()
+                    self._stop_timer = None
+                if self._process is None:
+                    self._start()
+
+            while True:
+                sub.ready.wait()
+                sub.ready.clear()
+                while sub.chunks:
+                    yield sub.chunks.popleft()
+                if sub.closed:
+                    return
+        finally:
+            with self._lock:
+                self._subscribers.discard(sub)
+                if not self._subscribers and self._process is not None and self._stop_timer is None:
+                    self._stop_timer = threading.Timer(self.IDLE_GRACE, self._stop_if_idle)
+                    self._stop_timer.daemon = True
+                    self._stop_timer.start()
@@ -4,6 +4,7 @@
 
 // Socket.IO connection
 let socket = null;
+let lastDevices = null; // Device state from the last full update, patched by deltas
 const FALLBACK_REFRESH_INTERVAL = 10000; // Fallback if Socket.IO fails
 
 // --- Notification Settings ---
@@ -709,6 +710,7 @@ function handleStatusUpdate(data) {
 
     // Update each device card
     if (data.devices) {
+        lastDevices = data.devices;
         updateWizCard(data.devices.wiz);
         updateDreoCard(data.devices.dreo);
         updateTapoCard(data.devices.tapo);
@@ -724,6 +726,21 @@ function handleStatusUpdate(data) {
     updateTimestamp(data.timestamp);
 }
 
+/**
+ * Apply a status_delta (only the devices that changed) on top of the last full update
+ */
+function handleStatusDelta(data) {
+    if (!lastDevices) {
+        // Missed the full update - ask for one instead of rendering partial state
+        socket.emit('request_update');
+        return;
+    }
+    handleStatusUpdate({
+        timestamp: data.timestamp,
+        devices: { ...lastDevices, ...data.devices }
+    });
+}
+
 /**
  * Initialize Socket.IO connection
  */
@@ -750,6 +767,10 @@ function initSocketIO() {
 
     // Listen for status updates from server
     socket.on('status_update', handleStatusUpdate);
+    socket.on('status_delta', handleStatusDelta);
+
+    // Devices unchanged since the last status_update - just refresh the clock
+    socket.on('heartbeat', (data) => updateTimestamp(data.ts));
 }
 
 /**
@@ -59,30 +59,20 @@ function buildNoteAnnotations(notes) {
 /**
  * Create or update the Temperature History chart
  */
-function renderTempChart(history, currentSensors, notes, energyData = []) {
+function renderTempChart(series, currentSensors, notes, energyData = []) {
     const ctx = document.getElementById('tempChart');
     if (!ctx) return;
 
     // Check toggle state
     const showOverlay = document.getElementById('toggleEnergyOverlay')?.checked;
 
-    // Group data by address
-    const sensors = {};
-    history.forEach(r => {
-        if (!sensors[r.address]) sensors[r.address] = [];
-        sensors[r.address].push({
-            x: r.timestamp,
-            y: r.temp_c
-        });
-    });
-
-    // Create datasets
-    const datasets = Object.keys(sensors).map((addr, i) => {
+    // Create datasets (the server sends one series per sensor address)
+    const datasets = series.map((sensor, i) => {
+        const addr = sensor.address;
         // Find name: check currentSensors first to handle renaming
         const current = (currentSensors || []).find(s => s.address === addr);
         // Fallback to name in history record if available, else address
-        const historyName = history.find(r => r.address === addr)?.name;
-        const name = current ? current.name : (historyName || addr || 'Unknown');
+        const name = current ? current.name : (sensor.name || addr || 'Unknown');
 
         // Generate distinct color based on index
         const hue = (i * 137.5) % 360;
@@ -90,7 +80,7 @@ function renderTempChart(history, currentSensors, notes, energyData = []) {
 
         return {
             label: name,
-            data: sensors[addr],
+            data: sensor.t.map((t, j) => ({ x: t, y: sensor.v[j] })),
             borderColor: color,
             backgroundColor: color, // for tooltip point
             borderWidth: 2,
@@ -493,7 +483,7 @@ async function loadStats(period) {
     const notes = data.notes || [];
 
     // Temperature chart
-    if (data.temp_history && data.temp_history.length > 0) {
+    if (data.temp_series && data.temp_series.length > 0) {
         // We need chart.js date adapter for time scale, but let's try basic labels if adapter missing
         // Actually for multi-line time series we really need the adapter or manual parsing
         // For simplicity let's stick to standard line chart logic if we can map to common labels? 
@@ -503,7 +493,7 @@ async function loadStats(period) {
         // Let's use simple labels logic if we group by nearest hour?
         // No, let's just pass X as ISO string, Chart.js 4 might handle it or we use index mode with unified labels?
         // Let's try to enable date adapter in HTML or use primitive index.
-        renderTempChart(data.temp_history, data.temp_sensors, notes, data.energy_daily);
+        renderTempChart(data.temp_series, data.temp_sensors, notes, data.energy_daily);
     }
 
     // Energy chart (daily)
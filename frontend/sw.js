@@ -1,4 +1,4 @@
-const CACHE_NAME = 'smart-tent-v23';
+const CACHE_NAME = 'smart-tent-v27';
 const ASSETS = [
     '/',
     '/index.html',